@@ -0,0 +1,232 @@
+"""
+Solves many maze files at once.
+
+Usage: python batch.py (DIRECTORY | GLOB) [--strategy astar] [--workers 4]
+                       [--frontier-limit N] [--output results.jsonl]
+                       [--cache .mazecache] [--timeout SECONDS]
+
+Mazes are solved in parallel across a process pool, and one JSON line
+per maze is written in input order with the solution path and search
+stats. Results are cached on disk under the SHA-256 of the maze file's
+contents together with the backend, strategy and frontier limit, so
+reruns only solve mazes that are new or changed. Failures are only
+cached when they depend on nothing but the file (see PERMANENT_ERRORS),
+so mazes that ran out of memory or time are tried again. On workers
+short of memory, use the idastar strategy or a frontier limit (see
+Maze.solve); --timeout stops any one maze from holding up a worker.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+
+import grid
+import maze
+
+# Classes that can solve a maze file, see maze.Maze and grid.Grid
+BACKENDS = {
+    "maze": (maze.Maze, maze.STRATEGIES),
+    "grid": (grid.Grid, grid.STRATEGIES),
+}
+
+# Starts of the error messages that only depend on the maze file,
+# strategy and frontier limit, so are cached like solutions
+PERMANENT_ERRORS = (
+    "no solution",
+    "maze must have exactly one",
+    "unknown strategy",
+    "frontier_limit does not apply",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a batch of mazes.")
+    parser.add_argument("source", help="directory of .txt mazes, or a glob pattern")
+    parser.add_argument("--strategy", default="astar", choices=maze.STRATEGIES)
+    parser.add_argument("--backend", default="maze", choices=BACKENDS)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (one per core by default)")
+    parser.add_argument("--frontier-limit", type=int, default=None,
+                        help=f"frontier size cap for {', '.join(maze.BOUNDED)} on the maze backend")
+    parser.add_argument("--output", default=None,
+                        help="JSON lines file to write (standard output by default)")
+    parser.add_argument("--cache", default=".mazecache",
+                        help="directory of cached results")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds a single maze may take before it is given up")
+    args = parser.parse_args()
+
+    if args.strategy not in BACKENDS[args.backend][1]:
+        sys.exit(f"the {args.backend} backend has no {args.strategy} strategy")
+    if args.frontier_limit is not None and (args.backend != "maze"
+                                            or args.strategy not in maze.BOUNDED):
+        sys.exit(f"--frontier-limit needs the maze backend and one of {', '.join(maze.BOUNDED)}")
+    if args.timeout is not None and not hasattr(signal, "setitimer"):
+        sys.exit("--timeout needs interval timers, which this platform lacks")
+    files = find_mazes(args.source)
+    if not files:
+        sys.exit(f"no mazes found for {args.source}")
+
+    cache = None if args.no_cache else args.cache
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    solved = cached = failed = 0
+    try:
+        for result in solve_all(files, args.strategy, args.backend, args.workers, cache,
+                                args.frontier_limit, args.timeout):
+            output.write(json.dumps(result) + "\n")
+            if result.get("cached"):
+                cached += 1
+            elif "error" in result:
+                failed += 1
+            else:
+                solved += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{len(files)} mazes: {solved} solved, {cached} cached, {failed} failed.",
+          file=sys.stderr)
+
+
+def find_mazes(source):
+    """
+    Returns the sorted maze files in directory `source`, or matching
+    the glob pattern `source`.
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.txt")
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def solve_all(files, strategy, backend="maze", workers=None, cache=None, frontier_limit=None,
+              timeout=None):
+    """
+    Yields a result dict for each of `files`, in order. Results found
+    in the `cache` directory are yielded with "cached": True; the rest
+    are solved across a pool of `workers` processes, each given at most
+    `timeout` seconds, and cached unless they failed for a reason other
+    than one of PERMANENT_ERRORS.
+    """
+    # Hash every file first, so only cache misses go to the pool
+    results = [None] * len(files)
+    keys = []
+    pending = []
+    for i, path in enumerate(files):
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        key = f"{digest}-{backend}-{strategy}"
+        if frontier_limit is not None:
+            key += f"-{frontier_limit}"
+        keys.append(key)
+        results[i] = load_cached(cache, keys[i])
+        if results[i] is None:
+            pending.append(i)
+
+    solved = iter(())
+    pool = None
+    if pending:
+        workers = workers or os.cpu_count()
+        pool = multiprocessing.Pool(workers)
+        tasks = [(files[i], strategy, backend, frontier_limit, timeout) for i in pending]
+        solved = pool.imap(solve_file, tasks, chunksize=max(1, len(tasks) // (8 * workers)))
+
+    try:
+        for i, path in enumerate(files):
+            if results[i] is not None:
+                yield dict(results[i], file=path, cached=True)
+                continue
+            result = next(solved)
+            if "error" not in result or result["error"].startswith(PERMANENT_ERRORS):
+                save_cached(cache, keys[i], result)
+            yield dict(result, file=path)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def solve_file(task):
+    """
+    Worker task: solves one maze file and returns its result dict, with
+    an "error" entry instead of a solution if it cannot be solved, runs
+    out of memory or takes longer than its timeout.
+    """
+    path, strategy, backend, frontier_limit, timeout = task
+    solver = BACKENDS[backend][0]
+    result = {"strategy": strategy, "backend": backend}
+
+    # The alarm interrupts the search wherever it is, so the worker is
+    # free for the next maze
+    if timeout is not None:
+        signal.signal(signal.SIGALRM, time_out)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        m = solver(path)
+        if frontier_limit is None:
+            m.solve(strategy)
+        else:
+            m.solve(strategy, frontier_limit)
+    except TimeoutError:
+        return dict(result, error="timed out")
+    except MemoryError:
+        return dict(result, error="out of memory")
+    except Exception as e:
+        return dict(result, error=str(e))
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    actions, cells = m.solution
+    return dict(
+        result,
+        length=len(actions),
+        actions=actions,
+        cells=[list(cell) for cell in cells],
+        num_explored=m.num_explored,
+        max_frontier=m.max_frontier,
+        re_expansions=m.re_expansions,
+        elapsed=m.elapsed,
+    )
+
+
+def time_out(signum, frame):
+    """
+    Alarm handler of solve_file.
+    """
+    raise TimeoutError("timed out")
+
+
+def load_cached(cache, key):
+    """
+    Returns the cached result stored under `key`, or None.
+    """
+    if cache is None:
+        return None
+    try:
+        with open(os.path.join(cache, key + ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached(cache, key, result):
+    """
+    Stores `result` under `key`, writing a temporary file first so a
+    reader never sees a partial result.
+    """
+    if cache is None:
+        return
+    os.makedirs(cache, exist_ok=True)
+    path = os.path.join(cache, key + ".json")
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(result, f)
+    os.replace(temporary, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Compact grid backend for very large mazes.
+
+Maze keeps walls as lists of Python bools and states as (row, col)
+tuples, which costs dozens of bytes per cell. Grid reads the same maze
+files but stores the walls as a bitset, one bit per cell, and numbers
+cells with flat integer indexes
+
+    state = row * stride + col
+
+where stride is the width rounded up to a multiple of 8, so each row
+starts on a byte boundary of the bitset. A search keeps a single
+preallocated bytearray, one byte per cell, that records how each cell
+was first reached (0 while unreached), which serves as both the
+visited set and the parent pointers. Frontiers hold plain integers.
+"""
+
+import heapq
+import re
+import sys
+import time
+from array import array
+
+# Search strategies Grid.solve accepts, see Maze.solve
+STRATEGIES = ("dfs", "bfs", "greedy", "ucs", "astar")
+
+# Actions in the order neighbors are tried; came_from holds the index
+# of the action that reached a cell plus one, and START for the start
+ACTIONS = ("up", "down", "left", "right")
+START = len(ACTIONS) + 1
+
+
+class Grid():
+
+    def __init__(self, filename):
+
+        # Read file
+        with open(filename) as f:
+            contents = f.read()
+
+        # Validate start and goal
+        if contents.count("A") != 1:
+            raise Exception("maze must have exactly one start point")
+        if contents.count("B") != 1:
+            raise Exception("maze must have exactly one goal")
+
+        # Determine height and width of maze
+        lines = contents.splitlines()
+        del contents
+        self.height = len(lines)
+        self.width = max(len(line) for line in lines)
+        self.stride = (self.width + 7) // 8 * 8
+
+        # Pack each row into bits, like Maze: spaces, A and B are open,
+        # any other character is a wall, and short lines are padded
+        # with open cells; columns past the width are walls
+        open_cells = str.maketrans(" AB", "000")
+        self.walls = bytearray()
+        for i, line in enumerate(lines):
+            if "A" in line:
+                self.start = i * self.stride + line.index("A")
+            if "B" in line:
+                self.goal = i * self.stride + line.index("B")
+            bits = re.sub("[^ AB]", "1", line).translate(open_cells)
+            bits = bits.ljust(self.width, "0").ljust(self.stride, "1")
+            self.walls += int(bits, 2).to_bytes(self.stride // 8, "big")
+            lines[i] = None
+
+        self.solution = None
+
+    def cell(self, state):
+        """Returns the (row, col) of a flat state index."""
+        return divmod(state, self.stride)
+
+    def index(self, row, col):
+        """Returns the flat state index of (row, col)."""
+        return row * self.stride + col
+
+    def is_wall(self, state):
+        return self.walls[state >> 3] & (128 >> (state & 7)) != 0
+
+    def heuristic(self, state):
+        """Manhattan distance from state to the goal."""
+        row, col = divmod(state, self.stride)
+        goal_row, goal_col = divmod(self.goal, self.stride)
+        return abs(row - goal_row) + abs(col - goal_col)
+
+    def neighbors(self, state):
+        """Returns (code, state) pairs for the open cells next to state,
+            where code is the index of the action plus one."""
+        stride = self.stride
+        walls = self.walls
+        col = state % stride
+        result = []
+        for code, (ok, step) in enumerate((
+            (state >= stride, -stride),
+            (state + stride < len(walls) * 8, stride),
+            (col > 0, -1),
+            (col + 1 < self.width, 1),
+        ), 1):
+            if ok:
+                other = state + step
+                if not walls[other >> 3] & (128 >> (other & 7)):
+                    result.append((code, other))
+        return result
+
+    def solve(self, strategy="bfs"):
+        """
+        Finds a solution to the maze, if one exists, with one of
+        STRATEGIES (see Maze.solve), in memory linear in the number of
+        cells: one byte per cell plus the frontier.
+
+        Sets solution to (actions, cells) with cells as (row, col), and
+        records num_explored, max_frontier, re_expansions and elapsed like
+        Maze.solve; no cell is ever expanded twice.
+        """
+        if strategy not in STRATEGIES:
+            raise Exception(f"unknown strategy: {strategy}")
+
+        self.num_explored = 0
+        self.max_frontier = 0
+        self.re_expansions = 0
+        started = time.perf_counter()
+
+        size = len(self.walls) * 8
+        steps = (-self.stride, self.stride, -1, 1)
+        self.came_from = came_from = bytearray(size)
+        typecode = "i" if size < 2 ** 31 else "q"
+
+        if strategy in ("dfs", "bfs"):
+            # Cells are marked when first added, so each is added once
+            came_from[self.start] = START
+            frontier = array(typecode, [self.start])
+            head = 0
+            while head < len(frontier):
+                self.max_frontier = max(self.max_frontier, len(frontier) - head)
+                if strategy == "bfs":
+                    state = frontier[head]
+                    head += 1
+                else:
+                    state = frontier.pop()
+                self.num_explored += 1
+                if state == self.goal:
+                    break
+                for code, other in self.neighbors(state):
+                    if not came_from[other]:
+                        came_from[other] = code
+                        frontier.append(other)
+            else:
+                self.elapsed = time.perf_counter() - started
+                raise Exception("no solution")
+
+        else:
+            # Heap entries pack (priority, state, code) into one integer;
+            # a cell is marked when first removed, which is when its
+            # cheapest entry is removed for ucs and astar
+            span = size * (START + 1)
+            h = self.heuristic
+            if strategy == "greedy":
+                priority = lambda g, state: h(state)
+            elif strategy == "ucs":
+                priority = lambda g, state: g
+            else:
+                # Like Maze, astar breaks ties in f by the lower h, so
+                # its priority packs (f, h) too, with h < ties
+                ties = self.height + self.width
+
+                def priority(g, state):
+                    estimate = h(state)
+                    return (g + estimate) * ties + estimate
+
+            costs = {}
+            frontier = [priority(0, self.start) * span + self.start * (START + 1) + START]
+            while frontier:
+                self.max_frontier = max(self.max_frontier, len(frontier))
+                state, code = divmod(heapq.heappop(frontier) % span, START + 1)
+                if came_from[state]:
+                    continue
+                came_from[state] = code
+                self.num_explored += 1
+                if state == self.goal:
+                    break
+
+                # g is only kept for cells in the frontier
+                g = costs.pop(state, 0) + 1
+                for code, other in self.neighbors(state):
+                    if came_from[other] or costs.get(other, g + 1) <= g:
+                        continue
+                    costs[other] = g
+                    heapq.heappush(frontier, priority(g, other) * span + other * (START + 1) + code)
+            else:
+                self.elapsed = time.perf_counter() - started
+                raise Exception("no solution")
+
+        # Walk the action codes back from the goal
+        actions = []
+        cells = []
+        state = self.goal
+        while came_from[state] != START:
+            code = came_from[state]
+            actions.append(ACTIONS[code - 1])
+            cells.append(self.cell(state))
+            state -= steps[code - 1]
+        actions.reverse()
+        cells.reverse()
+        self.solution = (actions, cells)
+        self.elapsed = time.perf_counter() - started
+
+
+def main():
+    if len(sys.argv) not in (2, 3) or sys.argv[2:] and sys.argv[2] not in STRATEGIES:
+        sys.exit(f"Usage: python grid.py maze.txt [{'|'.join(STRATEGIES)}]")
+    strategy = sys.argv[2] if len(sys.argv) == 3 else "bfs"
+
+    grid = Grid(sys.argv[1])
+    print(f"Maze: {grid.height} x {grid.width}")
+    print("Solving...")
+    grid.solve(strategy)
+    print("States Explored:", grid.num_explored)
+    print("Peak Frontier:", grid.max_frontier)
+    print(f"Time: {grid.elapsed * 1000:.2f} ms")
+    print("Solution Length:", len(grid.solution[0]))
+
+
+if __name__ == "__main__":
+    main()
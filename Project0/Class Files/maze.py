@@ -1,43 +1,18 @@
 import sys
+import time
+from array import array
 
-class Node():
-    def __init__(self, state, parent, action):
-        self.state = state
-        self.parent = parent
-        self.action = action
+from util import Node, StackFrontier, QueueFrontier, PriorityFrontier
 
+# Search strategies Maze.solve accepts
+STRATEGIES = ("dfs", "bfs", "greedy", "ucs", "astar", "jps", "idastar")
 
-class StackFrontier():
-    def __init__(self):
-        self.frontier = []
+# Shortest path strategies whose frontier Maze.solve can cap
+BOUNDED = ("ucs", "astar", "jps")
 
-    def add(self, node):
-        self.frontier.append(node)
+# Maps each (row, col) step to the action taking it
+DIRECTIONS = {(-1, 0): "up", (1, 0): "down", (0, -1): "left", (0, 1): "right"}
 
-    def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
-
-    def empty(self):
-        return len(self.frontier) == 0
-
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
-
-
-class QueueFrontier(StackFrontier):
-
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
 
 class Maze():
 
@@ -116,30 +91,257 @@ class Maze():
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def reachable(self):
+        """
+        Checks if the goal can be reached from the start, by a flood fill
+        that marks the cells it reaches in a bitset of one bit per cell,
+        like grid.Grid's walls.
+        """
+        seen = bytearray((self.height * self.width + 7) // 8)
+        cell = self.start[0] * self.width + self.start[1]
+        seen[cell >> 3] |= 1 << (cell & 7)
+        stack = [self.start]
+        while stack:
+            state = stack.pop()
+            if state == self.goal:
+                return True
+            for _, (row, col) in self.neighbors(state):
+                cell = row * self.width + col
+                if not seen[cell >> 3] & (1 << (cell & 7)):
+                    seen[cell >> 3] |= 1 << (cell & 7)
+                    stack.append((row, col))
+        return False
+
+
+    def heuristic(self, state):
+        """Manhattan distance from state to the goal."""
+        row, col = state
+        return abs(row - self.goal[0]) + abs(col - self.goal[1])
+
+
+    def is_open(self, row, col):
+        """Checks if (row, col) is a cell inside the maze and not a wall."""
+        return 0 <= row < self.height and 0 <= col < self.width and not self.walls[row][col]
+
+
+    def jump(self, row, col, drow, dcol):
+        """
+        Moves from (row, col) one cell at a time in direction (drow, dcol)
+        and returns the first jump point reached, or None if a wall comes
+        first. Jump points are the goal, and cells where a search cannot
+        skip ahead without possibly losing a shortest path:
+            - moving sideways, a cell with an open cell above or below it
+              whose neighbor behind is a wall (a forced neighbor)
+            - moving up or down, a cell from which a sideways jump finds
+              a jump point
+        """
+        if drow == 0:
+            # Sideways runs stay on one row, so scan its wall list directly
+            walls = self.walls[row]
+            above = self.walls[row - 1] if row > 0 else None
+            below = self.walls[row + 1] if row + 1 < self.height else None
+            goal = self.goal[1] if self.goal[0] == row else None
+            while True:
+                col += dcol
+                if not 0 <= col < self.width or walls[col]:
+                    return None
+                if col == goal:
+                    return (row, col)
+                for side in (above, below):
+                    if side is not None and not side[col] and side[col - dcol]:
+                        return (row, col)
+
+        while True:
+            row += drow
+            if not self.is_open(row, col):
+                return None
+            if (row, col) == self.goal:
+                return (row, col)
+            if self.jump(row, col, 0, -1) or self.jump(row, col, 0, 1):
+                return (row, col)
+
+
+    def solve_jps(self, frontier, costs, frontier_limit=None):
+        """
+        Jump Point Search: A* over jump points only (see jump), where a
+        jump point reached moving sideways continues sideways or turns
+        up or down, and one reached moving up or down continues or turns
+        sideways. Straight runs between jump points are filled back in
+        when the goal is reached.
+        """
+        while True:
+            self.max_frontier = max(self.max_frontier, len(frontier))
+
+            # If nothing left in frontier, then no path
+            if frontier.empty():
+                raise Exception("no solution")
+
+            # Choose a node from the frontier. A node expanded again after
+            # pruning has its priority backed up from the pruned children,
+            # which is a floor for their priorities when regenerated
+            floor = frontier.lowest() if frontier_limit is not None else None
+            node = frontier.remove()
+            self.num_explored += 1
+            if node.state in self.reopened:
+                self.reopened.remove(node.state)
+                self.re_expansions += 1
+            else:
+                floor = None
+
+            # If node is the goal, fill in the runs between jump points
+            if node.state == self.goal:
+                actions = []
+                cells = []
+                while node.parent is not None:
+                    (row, col), (prow, pcol) = node.state, node.parent.state
+                    length = abs(row - prow) + abs(col - pcol)
+                    step = ((row - prow) // length, (col - pcol) // length)
+                    for i in range(length, 0, -1):
+                        actions.append(node.action)
+                        cells.append((prow + step[0] * i, pcol + step[1] * i))
+                    node = node.parent
+                actions.reverse()
+                cells.reverse()
+                self.solution = (actions, cells)
+                return
+
+            # Mark node as explored
+            self.explored.add(node.state)
 
-        # Keep track of number of states explored
+            # Directions worth jumping in, given how the node was reached
+            if node.parent is None:
+                directions = list(DIRECTIONS)
+            elif node.action in ("left", "right"):
+                step = (0, 1) if node.action == "right" else (0, -1)
+                directions = [step, (-1, 0), (1, 0)]
+            else:
+                step = (1, 0) if node.action == "down" else (-1, 0)
+                directions = [step, (0, -1), (0, 1)]
+
+            # Add the jump points found to frontier
+            row, col = node.state
+            for drow, dcol in directions:
+                point = self.jump(row, col, drow, dcol)
+                if point is None or point in self.explored and frontier_limit is None:
+                    continue
+                cost = costs[node.state] + abs(point[0] - row) + abs(point[1] - col)
+                if not self.improves(frontier, costs, point, cost):
+                    continue
+                costs[point] = cost
+                child = Node(state=point, parent=node, action=DIRECTIONS[(drow, dcol)])
+                self.push(frontier, child, floor)
+
+            # Keep the frontier within its limit
+            while frontier_limit is not None and len(frontier) > frontier_limit:
+                if not self.prune(frontier, costs):
+                    break
+
+
+    def solve(self, strategy="dfs", frontier_limit=None):
+        """
+        Finds a solution to maze, if one exists, using one of STRATEGIES:
+            - "dfs": depth-first search
+            - "bfs": breadth-first search, shortest path
+            - "greedy": greedy best-first search on the Manhattan distance
+            - "ucs": uniform cost search, shortest path
+            - "astar": A* search with the Manhattan distance, shortest path
+            - "jps": Jump Point Search, A* that only expands jump points
+            - "idastar": iterative deepening A*, shortest path, holding only
+              the current path and a cost per cell (see solve_idastar)
+
+        frontier_limit caps the frontier of the BOUNDED strategies: past
+        it, the worst nodes are pruned SMA*-style (see prune) and their
+        parents expanded again later. They still find a shortest path,
+        and the frontier only outgrows the limit while it holds nodes
+        tied for the lowest priority; the costs of pruned nodes are
+        forgotten, but the explored set is not bounded; idastar keeps
+        no frontier, only a cost per cell. As these searches can take very long to find there is no
+        path, they first check that there is one (see reachable).
+
+        Records num_explored, max_frontier (the peak frontier size, or
+        the peak path length for idastar), re_expansions (expansions of
+        states already expanded before, after pruning or by idastar) and
+        elapsed (wall time in seconds).
+        """
+        if strategy not in STRATEGIES:
+            raise Exception(f"unknown strategy: {strategy}")
+        if frontier_limit is not None and strategy not in BOUNDED:
+            raise Exception(f"frontier_limit does not apply to {strategy}")
+
+        # Keep track of number of states explored, frontier size and time
         self.num_explored = 0
+        self.max_frontier = 0
+        self.re_expansions = 0
+        started = time.perf_counter()
+
+        if (strategy == "idastar" or frontier_limit is not None) and not self.reachable():
+            self.elapsed = time.perf_counter() - started
+            raise Exception("no solution")
+
+        # Iterative deepening keeps no frontier or explored set
+        if strategy == "idastar":
+            self.explored = set()
+            try:
+                self.solve_idastar()
+            finally:
+                self.elapsed = time.perf_counter() - started
+            return
+
+        # Path cost of the best known way to each state
+        costs = {self.start: 0}
+
+        # Priority of a node for the informed strategies
+        if strategy == "greedy":
+            priority = lambda node: self.heuristic(node.state)
+        elif strategy == "ucs":
+            priority = lambda node: costs[node.state]
+        else:
+            # Ties on f go to the node nearer the goal, i.e. the deeper one
+            priority = lambda node: (costs[node.state] + self.heuristic(node.state),
+                                     self.heuristic(node.state))
 
         # Initialize frontier to just the starting position
         start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
+        if strategy == "dfs":
+            frontier = StackFrontier()
+        elif strategy == "bfs":
+            frontier = QueueFrontier()
+        else:
+            frontier = PriorityFrontier(priority)
         frontier.add(start)
 
-        # Initialize an empty explored set
+        # Initialize an empty explored set, and the states taken back
+        # out of it by pruning
         self.explored = set()
+        self.reopened = set()
+
+        if strategy == "jps":
+            try:
+                self.solve_jps(frontier, costs, frontier_limit)
+            finally:
+                self.elapsed = time.perf_counter() - started
+            return
 
         # Keep looping until solution found
         while True:
+            self.max_frontier = max(self.max_frontier, len(frontier))
 
             # If nothing left in frontier, then no path
             if frontier.empty():
+                self.elapsed = time.perf_counter() - started
                 raise Exception("no solution")
 
-            # Choose a node from the frontier
+            # Choose a node from the frontier. A node expanded again after
+            # pruning has its priority backed up from the pruned children,
+            # which is a floor for their priorities when regenerated
+            floor = frontier.lowest() if frontier_limit is not None else None
             node = frontier.remove()
             self.num_explored += 1
+            if node.state in self.reopened:
+                self.reopened.remove(node.state)
+                self.re_expansions += 1
+            else:
+                floor = None
 
             # If node is the goal, then we have a solution
             if node.state == self.goal:
@@ -152,6 +354,7 @@ class Maze():
                 actions.reverse()
                 cells.reverse()
                 self.solution = (actions, cells)
+                self.elapsed = time.perf_counter() - started
                 return
 
             # Mark node as explored
@@ -159,16 +362,201 @@ class Maze():
 
             # Add neighbors to frontier
             for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
+                if state in self.explored and frontier_limit is None:
+                    continue
+                if isinstance(frontier, PriorityFrontier):
+                    cost = costs[node.state] + 1
+                    if not self.improves(frontier, costs, state, cost):
+                        continue
+                    costs[state] = cost
+                    child = Node(state=state, parent=node, action=action)
+                    self.push(frontier, child, floor)
+                elif not frontier.contains_state(state):
                     child = Node(state=state, parent=node, action=action)
                     frontier.add(child)
 
+            # Keep the frontier within its limit
+            while frontier_limit is not None and len(frontier) > frontier_limit:
+                if not self.prune(frontier, costs):
+                    break
+
+
+    def improves(self, frontier, costs, state, cost):
+        """
+        Returns whether reaching state at cost beats the best known way
+        to it, keeping the cheaper of two ways to a state in the
+        frontier. Once prune has forgotten a state, it can be expanded
+        by a dearer way first; an explored state reached more cheaply
+        later goes back out of the explored set to be expanded again.
+        """
+        known = costs.get(state)
+        if known is not None and (known < cost or known == cost and (
+                state in self.explored or frontier.contains_state(state))):
+            return False
+        if state in self.explored:
+            self.explored.remove(state)
+            self.reopened.add(state)
+        return True
+
+
+    def push(self, frontier, child, floor):
+        """
+        Adds child, found a cheaper way than any known (see improves), to
+        frontier. Children generated by a node expanded again after
+        pruning get at least its backed up priority, floor, so may come
+        out higher than the node already held for their state; child
+        replaces that node all the same, with the lower of the two
+        priorities, since both bound the cost of a solution through it.
+        """
+        if floor is None:
+            frontier.add(child)
+            return
+        priority = max(frontier.priority(child), floor)
+        if frontier.contains_state(child.state):
+            priority = min(priority, frontier.priority_of(child.state))
+            frontier.discard(child.state)
+        frontier.add(child, priority)
+
+
+    def prune(self, frontier, costs):
+        """
+        SMA*-style pruning: drops the node with the highest priority from
+        frontier and backs its priority up to its parent, which goes back
+        on the frontier (and out of the explored set) with that priority,
+        so the dropped node is generated again once the search gets back
+        to it. The start is never dropped. Returns False, dropping
+        nothing, if the worst node is tied for the lowest priority, as
+        the search could then keep dropping and regenerating the same
+        nodes.
+        """
+        worst = frontier.worst(keep=self.start)
+        if worst is None or worst[0] <= frontier.lowest():
+            return False
+        priority, node = worst
+        parent = node.parent
+        frontier.discard(node.state)
+
+        # A node not expanded since it was generated has no children
+        # left, so its cost is forgotten with it
+        if node.state not in self.reopened:
+            del costs[node.state]
+        if parent.state in self.explored:
+            self.explored.remove(parent.state)
+            self.reopened.add(parent.state)
+        frontier.add(parent, priority)
+        return True
+
+
+    def successors(self, state):
+        """
+        Returns the neighbors of state nearest the goal first, so that
+        the last round of solve_idastar reaches the goal sooner.
+        """
+        return sorted(self.neighbors(state), key=lambda neighbor: self.heuristic(neighbor[1]))
+
+
+    def solve_idastar(self):
+        """
+        Iterative deepening A*: rounds of depth-first search that only
+        follow paths whose f = g + h stays within a bound, starting at
+        h of the start and raised each round to the lowest f that went
+        over it. A round only holds the current path and, for each cell,
+        the least g it was reached with this round: a path that reaches
+        a cell no cheaper than an earlier one is cut, since everything
+        past it was already searched within the bound. Memory grows with
+        the maze only by those costs and a bit per cell recording which
+        cells were expanded before; cells are expanded again every round.
+        """
+        cells = self.height * self.width
+        expanded = bytearray((cells + 7) // 8)
+
+        # Costs stay below the number of cells, so unseen is above them all
+        typecode = "H" if cells < 2 ** 16 - 1 else "I"
+        unseen = 2 ** 16 - 1 if typecode == "H" else 2 ** 32 - 1
+
+        def expand(state):
+            # Counts an expansion, and a re-expansion after the first
+            self.num_explored += 1
+            cell = state[0] * self.width + state[1]
+            if expanded[cell >> 3] & (1 << (cell & 7)):
+                self.re_expansions += 1
+            else:
+                expanded[cell >> 3] |= 1 << (cell & 7)
+
+        width = self.width
+        bound = self.heuristic(self.start)
+        while True:
+            # Each level of the stack iterates over the neighbors of the
+            # cell at the same depth of path
+            best = array(typecode, [unseen]) * cells
+            best[self.start[0] * width + self.start[1]] = 0
+            path = [self.start]
+            actions = []
+            stack = [iter(self.successors(self.start))]
+            exceeded = None
+            expand(self.start)
+            if self.start == self.goal:
+                self.solution = ([], [])
+                return
+
+            while stack:
+                self.max_frontier = max(self.max_frontier, len(path))
+                g = len(path)
+                for action, state in stack[-1]:
+                    # Cells on the path were reached cheaper, so this
+                    # also keeps paths from looping
+                    cell = state[0] * width + state[1]
+                    if best[cell] <= g:
+                        continue
+                    f = g + self.heuristic(state)
+                    if f <= bound:
+                        break
+                    if exceeded is None or f < exceeded:
+                        exceeded = f
+                else:
+                    # Every neighbor tried, so backtrack
+                    stack.pop()
+                    path.pop()
+                    if actions:
+                        actions.pop()
+                    continue
+
+                best[cell] = g
+                path.append(state)
+                actions.append(action)
+                expand(state)
+                if state == self.goal:
+                    self.solution = (actions, path[1:])
+                    return
+                stack.append(iter(self.successors(state)))
+
+            if exceeded is None:
+                raise Exception("no solution")
+            bound = exceeded
+
 
     def output_image(self, filename, show_solution=True, show_explored=False):
+        """
+        Draws the maze to an image file. With NumPy installed, the whole
+        picture is built as one array (see image_array) and handed to
+        PIL once; otherwise each cell is drawn as a rectangle.
+        """
         from PIL import Image, ImageDraw
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
         cell_size = 50
         cell_border = 2
 
+        solution = set(self.solution[1]) if self.solution is not None else None
+
+        if np is not None:
+            pixels = self.image_array(np, cell_size, cell_border, solution,
+                                      show_solution, show_explored)
+            Image.fromarray(pixels, "RGBA").save(filename)
+            return
+
         # Create a blank canvas
         img = Image.new(
             "RGBA",
@@ -177,7 +565,6 @@ class Maze():
         )
         draw = ImageDraw.Draw(img)
 
-        solution = self.solution[1] if self.solution is not None else None
         for i, row in enumerate(self.walls):
             for j, col in enumerate(row):
 
@@ -215,15 +602,63 @@ class Maze():
         img.save(filename)
 
 
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+    def image_array(self, np, cell_size, cell_border, solution, show_solution, show_explored):
+        """
+        Returns the picture output_image draws as a (height, width, 4)
+        RGBA array: one color code per cell from the wall grid and the
+        solution and explored masks, looked up in a palette, upscaled
+        with np.repeat and masked to the same borders as the rectangles.
+        """
+        # Empty, wall, start, goal, solution, explored
+        palette = np.array([
+            (237, 240, 252, 255), (40, 40, 40, 255), (255, 0, 0, 255),
+            (0, 171, 28, 255), (220, 235, 113, 255), (212, 97, 85, 255),
+        ], dtype=np.uint8)
+
+        # Later layers win, as earlier branches do in the drawing loop
+        codes = np.zeros((self.height, self.width), dtype=np.uint8)
+        if solution is not None and show_explored and self.explored:
+            rows, cols = zip(*self.explored)
+            codes[list(rows), list(cols)] = 5
+        if solution is not None and show_solution and solution:
+            rows, cols = zip(*solution)
+            codes[list(rows), list(cols)] = 4
+        codes[self.goal] = 3
+        codes[self.start] = 2
+        codes[np.array(self.walls, dtype=bool)] = 1
+
+        pixels = palette[codes]
+        pixels = np.repeat(np.repeat(pixels, cell_size, axis=0), cell_size, axis=1)
+
+        # A rectangle covers offsets cell_border .. cell_size - cell_border
+        # of its cell, inclusive; the rest of the canvas stays black
+        offsets = np.arange(cell_size)
+        inside = (offsets >= cell_border) & (offsets <= cell_size - cell_border)
+        mask = np.outer(np.tile(inside, self.height), np.tile(inside, self.width))
+        pixels[~mask] = (0, 0, 0, 255)
+        return pixels
+
+
+def main():
+    if (len(sys.argv) not in (2, 3, 4) or sys.argv[2:] and sys.argv[2] not in STRATEGIES
+            or sys.argv[3:] and not sys.argv[3].isdigit()):
+        sys.exit(f"Usage: python maze.py maze.txt [{'|'.join(STRATEGIES)}] [frontier_limit]")
+    strategy = sys.argv[2] if len(sys.argv) >= 3 else "dfs"
+    frontier_limit = int(sys.argv[3]) if len(sys.argv) == 4 else None
+
+    m = Maze(sys.argv[1])
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(strategy, frontier_limit)
+    print("States Explored:", m.num_explored)
+    print("Peak Frontier:", m.max_frontier)
+    print("Re-expansions:", m.re_expansions)
+    print(f"Time: {m.elapsed * 1000:.2f} ms")
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import heapq
+import itertools
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,40 +12,175 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
-        """Creates empty frontier in form of list"""
+        """Creates empty frontier in form of a deque, plus a count of
+            the nodes held for each state"""
+        self.frontier = deque()
+        self.states = {}
 
     def add(self, node):
+        """Appends frontier by adding node to end of deque"""
         self.frontier.append(node)
-        """Appends frontier by adding node to end of list"""
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
-        """checks if frontier contains particular state"""
+        """checks if frontier contains particular state, in constant time"""
+        return state in self.states
 
     def empty(self):
+        """Checks if frontier is empty"""
         return len(self.frontier) == 0
-        """Checks if frontieer is empty"""
+
+    def __len__(self):
+        return len(self.frontier)
 
     def remove(self):
+        """Removes last item from deque (Stack Frontier,
+            last in, first out)"""
         if self.empty():
             raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.discard(node.state)
+        return node
+
+    def discard(self, state):
+        """Forgets one node of a state that has left the frontier"""
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
-        """Removes last item from list (Stack Frontier,
-            last in, first out)"""
+            self.states[state] = count - 1
 
 
 class QueueFrontier(StackFrontier):
 
     def remove(self):
+        """Removes first item from deque (Queue frontier,
+            first in, first out)"""
         if self.empty():
             raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
-        """Removes first item from list (Queue frontier,
-            first in, first out)"""
+        node = self.frontier.popleft()
+        self.discard(node.state)
+        return node
+
+
+def negated(priority):
+    """Returns a key that orders priorities, numbers or tuples of
+        numbers, highest first"""
+    if isinstance(priority, tuple):
+        return tuple(-part for part in priority)
+    return -priority
+
+
+class PriorityFrontier():
+    def __init__(self, priority=None):
+        """Creates empty frontier in form of a binary heap. Nodes come
+            out lowest priority first, where priority(node) gives the
+            priority of nodes added without one; ties come out first in,
+            first out"""
+        self.priority = priority
+        self.frontier = []
+        self.entries = {}
+        self.counter = itertools.count()
+        # Second heap of [negated(priority), count, entry], highest
+        # priority first, only kept from the first call to worst on
+        self.highest = None
+
+    def add(self, node, priority=None):
+        """Adds node, or lowers the priority of the node already held
+            for its state if node has a lower one (decrease-key).
+            Returns whether node was added"""
+        if priority is None:
+            priority = self.priority(node)
+        entry = self.entries.get(node.state)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+            # The old entry stays in the heap, marked as removed
+            entry[2] = None
+        entry = [priority, next(self.counter), node]
+        self.entries[node.state] = entry
+        heapq.heappush(self.frontier, entry)
+        if self.highest is not None:
+            heapq.heappush(self.highest, [negated(priority), entry[1], entry])
+            self.compact()
+        return True
+
+    def contains_state(self, state):
+        """checks if frontier contains particular state, in constant time"""
+        return state in self.entries
+
+    def priority_of(self, state):
+        """Returns the priority of the node held for state"""
+        return self.entries[state][0]
+
+    def empty(self):
+        """Checks if frontier is empty"""
+        return len(self.entries) == 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def remove(self):
+        """Removes the node with the lowest priority"""
+        if self.empty():
+            raise Exception("empty frontier")
+        while True:
+            entry = heapq.heappop(self.frontier)
+            node = entry[2]
+            if node is not None:
+                del self.entries[node.state]
+                entry[2] = None
+                return node
+
+    def lowest(self):
+        """Returns the priority of the node remove would return next"""
+        if self.empty():
+            raise Exception("empty frontier")
+        while self.frontier[0][2] is None:
+            heapq.heappop(self.frontier)
+        return self.frontier[0][0]
+
+    def worst(self, keep=None):
+        """Returns (priority, node) for the node with the highest
+            priority, the first one added among ties, other than the node
+            held for state keep; None if there is none. Takes logarithmic
+            time amortized, from a second heap built on the first call"""
+        if self.highest is None:
+            self.rebuild_highest()
+        highest = self.highest
+
+        # Drop removed entries off the top, setting aside the one for keep
+        kept = found = None
+        while highest:
+            entry = highest[0][2]
+            if entry[2] is None:
+                heapq.heappop(highest)
+            elif entry[2].state == keep and kept is None:
+                kept = heapq.heappop(highest)
+            else:
+                found = entry
+                break
+        if kept is not None:
+            heapq.heappush(highest, kept)
+        if found is None:
+            return None
+        return found[0], found[2]
+
+    def discard(self, state):
+        """Removes the node held for state"""
+        self.entries.pop(state)[2] = None
+        self.compact()
+
+    def compact(self):
+        """Rebuilds the heaps once removed entries outnumber the live
+            ones, so they stay within twice the size of the frontier"""
+        if len(self.frontier) > 2 * len(self.entries) + 8:
+            self.frontier = list(self.entries.values())
+            heapq.heapify(self.frontier)
+        if self.highest is not None and len(self.highest) > 2 * len(self.entries) + 8:
+            self.rebuild_highest()
+
+    def rebuild_highest(self):
+        """Builds the heap worst takes nodes from"""
+        self.highest = [[negated(entry[0]), entry[1], entry] for entry in self.entries.values()]
+        heapq.heapify(self.highest)
@@ -0,0 +1,215 @@
+"""
+Benchmarks the shortest_path engines on a dataset.
+
+Each engine runs in a fresh process, so its load time and peak memory
+are measured from a clean interpreter, and answers the same random
+pairs of people. Reported per engine:
+
+    load      seconds to load the data, or map its snapshot
+    setup     seconds to build or map the engine's own index, if any
+    peak RSS  peak resident memory of the process, n/a on Windows
+    p50, p99  query latency percentiles
+    expanded  mean people expanded per query (num_explored)
+    timeouts  queries that ran out of their time limit
+
+An engine that times out on --max-timeouts queries skips the rest of
+them, which count as timeouts too, so one slow engine can't hold up
+the run. The one-sided "bfs" baseline only runs when asked for, as it
+is by far the slowest on large datasets.
+
+Usage: python benchmark.py DIRECTORY [--engines bfs compact ...] [--queries 50]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+
+import degrees
+import snapshot as snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the degrees search engines.")
+    parser.add_argument("directory")
+    parser.add_argument("--engines", nargs="+", choices=degrees.ENGINES,
+                        default=[engine for engine in degrees.ENGINES if engine != "bfs"])
+    parser.add_argument("--queries", type=int, default=50,
+                        help="random pairs of people each engine answers")
+    parser.add_argument("--timeout", type=float, default=2.0,
+                        help="seconds a single query may run")
+    parser.add_argument("--max-timeouts", type=int, default=3,
+                        help="timeouts after which an engine skips its remaining queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the results to FILE as JSON")
+    args = parser.parse_args()
+
+    # Build the snapshot up front so no engine's load time includes it
+    if degrees.COMPACT_ENGINES.intersection(args.engines):
+        snapshots.load_or_build(args.directory)
+
+    results = []
+    for engine in args.engines:
+        print(f"Running {engine}...", file=sys.stderr)
+        results.append(benchmark(args.directory, engine, args.queries, args.timeout,
+                                 args.max_timeouts, args.seed))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def benchmark(directory, engine, queries=50, timeout=2.0, max_timeouts=3, seed=0):
+    """
+    Runs `engine` in a fresh process and returns a dict of its results.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=run, args=(sender, directory, engine, queries, timeout, max_timeouts, seed)
+    )
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"engine": engine, "error": f"exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def run(connection, directory, engine, queries, timeout, max_timeouts, seed):
+    """
+    Process body of benchmark: loads the data, answers the queries and
+    sends the measurements back over `connection`.
+    """
+    try:
+        connection.send(measure(directory, engine, queries, timeout, max_timeouts, seed))
+    except Exception as e:
+        connection.send({"engine": engine, "error": repr(e)})
+    finally:
+        degrees.close_parallel()
+        connection.close()
+
+
+def measure(directory, engine, queries, timeout, max_timeouts, seed):
+    """
+    Loads `directory` for `engine` and times it over `queries` random
+    pairs of people, the same pairs for every engine with one seed,
+    until it has timed out `max_timeouts` times.
+    """
+    start = time.perf_counter()
+    # The dict engines parse the CSVs even when a snapshot exists, so
+    # they keep measuring the original data layout
+    compact = engine in degrees.COMPACT_ENGINES
+    degrees.load_data(directory, compact=compact, snapshot=compact)
+    load = time.perf_counter() - start
+
+    # Build what the engine would otherwise build on its first query
+    start = time.perf_counter()
+    if engine == "landmarks":
+        degrees.load_landmarks()
+    elif engine == "parallel":
+        degrees.parallel_path(*next(iter(pairs(1, seed + 1))))
+    setup = time.perf_counter() - start
+
+    latencies, expanded, timeouts = [], [], 0
+    for source, target in pairs(queries, seed):
+        if timeouts >= max_timeouts:
+            break
+        degrees.limits.deadline = time.monotonic() + timeout
+        start = time.perf_counter()
+        try:
+            degrees.shortest_path(source, target, engine=engine)
+        except TimeoutError:
+            timeouts += 1
+            continue
+        finally:
+            degrees.limits.deadline = None
+        latencies.append(time.perf_counter() - start)
+        expanded.append(degrees.num_explored)
+
+    return {
+        "engine": engine,
+        "people": len(degrees.people),
+        "movies": len(degrees.movies),
+        "load": load,
+        "setup": setup,
+        "peak_rss_mb": peak_rss_mb(),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "expanded": sum(expanded) / len(expanded) if expanded else 0,
+        "queries": queries,
+        # Skipped queries count as timed out
+        "timeouts": queries - len(latencies),
+    }
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB, or None
+    where the resource module is missing, as on Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def pairs(count, seed):
+    """
+    Returns `count` random (source, target) pairs of person_ids from the
+    largest component of the loaded data, since pairs in different
+    components are answered without a search. People are drawn by
+    position in file order, which both the dict and compact forms keep,
+    so every engine gets the same pairs.
+    """
+    labels = [degrees.component_of(person_id) for person_id in degrees.people]
+    largest = Counter(labels).most_common(1)[0][0]
+    person_ids = [
+        person_id for person_id, label in zip(degrees.people, labels)
+        if label == largest
+    ]
+    rng = random.Random(seed)
+    return [
+        (person_ids[rng.randrange(len(person_ids))], person_ids[rng.randrange(len(person_ids))])
+        for _ in range(count)
+    ]
+
+
+def percentile(values, p):
+    """
+    Returns the nearest-rank `p`th percentile of `values`, or 0.
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, -(-len(values) * p // 100) - 1))]
+
+
+def print_table(results):
+    """
+    Prints one row of measurements per engine.
+    """
+    print(f"{'engine':<14}{'load s':>9}{'setup s':>9}{'peak MB':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'expanded':>11}{'timeouts':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['engine']:<14}{result['error']}")
+            continue
+        peak = result["peak_rss_mb"]
+        peak = "n/a" if peak is None else f"{peak:.1f}"
+        print(f"{result['engine']:<14}{result['load']:>9.2f}{result['setup']:>9.2f}"
+              f"{peak:>10}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['expanded']:>11.0f}{result['timeouts']:>7}/{result['queries']}")
+
+
+if __name__ == "__main__":
+    main()
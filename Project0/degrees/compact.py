@@ -0,0 +1,669 @@
+"""
+Compact, integer-indexed form of the degrees dataset.
+
+People and movies are numbered 0..n-1 in file order and the bipartite
+star graph is stored twice in compressed sparse row (CSR) form:
+
+    person_offsets[p] .. person_offsets[p + 1]  indexes person_movies
+    movie_offsets[m]  .. movie_offsets[m + 1]   indexes movie_people
+
+so the movies of person p are person_movies[person_offsets[p]:person_offsets[p + 1]]
+and the cast of movie m is movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+
+The arrays are never resized. People, movies and star rows added later
+by apply are kept beside them: new people and movies get the next free
+indexes, and new star rows are listed per person and per movie, which
+movies_of and cast_of merge with the CSR slices.
+"""
+
+import csv
+import time
+from array import array
+from collections import deque
+from collections.abc import Mapping, Sequence
+
+
+class CompactGraph():
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None, name_index=None,
+                 components=None, component_sizes=None):
+        """
+        Wrap already built CSR arrays and per-index string columns.
+
+        The id and name indexes are built as dicts unless already
+        provided, e.g. as SortedIndex lookups over a snapshot, and the
+        component labelling is computed unless provided.
+        """
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # The CSR arrays cover the first base_people people and
+        # base_movies movies; star rows added since are listed here
+        self.base_people = len(person_ids)
+        self.base_movies = len(movie_ids)
+        self.extra_movies = {}
+        self.extra_cast = {}
+
+        # Maps string ids back to dense indexes
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # Maps lowercase names to a list of person indexes
+        if name_index is None:
+            name_index = {}
+            for i, name in enumerate(person_names):
+                name_index.setdefault(name.lower(), []).append(i)
+        self.name_index = name_index
+
+        # Connected component number of each person, and component sizes
+        if components is None:
+            components, component_sizes = self.label_components()
+        self.components = components
+        self.component_sizes = component_sizes
+
+        # Components joined since labelling: merged maps a component
+        # number to the one it was merged into, merged_sizes holds the
+        # sizes that changed, and added people get new numbers
+        self.merged = {}
+        self.merged_sizes = {}
+        self.extra_components = {}
+
+        # Views with the same shape as degrees.people / movies / names
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+        self.names = NamesView(self)
+
+        # Number of people expanded by the most recent search
+        self.num_explored = 0
+
+    def movies_of(self, person):
+        """
+        Returns the movie indexes a person index starred in.
+        """
+        movies = ()
+        if person < self.base_people:
+            movies = memoryview(self.person_movies)[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        extra = self.extra_movies.get(person)
+        return movies if extra is None else list(movies) + extra
+
+    def cast_of(self, movie):
+        """
+        Returns the person indexes starring in a movie index.
+        """
+        cast = ()
+        if movie < self.base_movies:
+            cast = memoryview(self.movie_people)[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        extra = self.extra_cast.get(movie)
+        return cast if extra is None else list(cast) + extra
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person who starred in nothing yet, in a component of
+        their own, and returns their index. People already known are
+        left unchanged.
+        """
+        if person_id in self.person_index:
+            return self.person_index[person_id]
+        person = len(self.person_ids)
+        for column, value in (("person_ids", person_id),
+                              ("person_names", name),
+                              ("person_births", birth)):
+            grow(self, column).append(value)
+        overlay(self, "person_index").add(person_id, person)
+        overlay(self, "name_index", multi=True).add(name.lower(), person)
+
+        label = len(self.component_sizes) + person - self.base_people
+        self.extra_components[person] = label
+        self.merged_sizes[label] = 1
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no cast yet and returns its index. Movies
+        already known are left unchanged.
+        """
+        if movie_id in self.movie_index:
+            return self.movie_index[movie_id]
+        movie = len(self.movie_ids)
+        for column, value in (("movie_ids", movie_id),
+                              ("movie_titles", title),
+                              ("movie_years", year)):
+            grow(self, column).append(value)
+        overlay(self, "movie_index").add(movie_id, movie)
+        return movie
+
+    def add_star(self, person, movie):
+        """
+        Records that person index `person` starred in movie index
+        `movie`, joining their components. Returns False if the row
+        was already known.
+        """
+        if movie in self.movies_of(person):
+            return False
+        cast = self.cast_of(movie)
+        if len(cast):
+            self.union(person, cast[0])
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_cast.setdefault(movie, []).append(person)
+        return True
+
+    def apply(self, changes):
+        """
+        Adds the rows of a delta read by delta.read_delta and returns the
+        star rows that were new as (person, movie) index pairs. Star rows
+        naming unknown people or movies are skipped, like in load_compact.
+        """
+        for row in changes["people"]:
+            self.add_person(row["id"], row["name"], row["birth"])
+        for row in changes["movies"]:
+            self.add_movie(row["id"], row["title"], row["year"])
+
+        stars = []
+        for row in changes["stars"]:
+            try:
+                person = self.person_index[row["person_id"]]
+                movie = self.movie_index[row["movie_id"]]
+            except KeyError:
+                continue
+            if self.add_star(person, movie):
+                stars.append((person, movie))
+        return stars
+
+    def component(self, person):
+        """
+        Returns the connected component number of a person index.
+        """
+        if person < self.base_people:
+            label = self.components[person]
+        else:
+            label = self.extra_components[person]
+        while label in self.merged:
+            label = self.merged[label]
+        return label
+
+    def component_size(self, label):
+        """
+        Returns the number of people in a component.
+        """
+        if label in self.merged_sizes:
+            return self.merged_sizes[label]
+        return self.component_sizes[label]
+
+    def component_size_list(self):
+        """
+        Returns a list of the number of people in each component.
+        """
+        labels = len(self.component_sizes) + len(self.person_ids) - self.base_people
+        return [
+            self.component_size(label) for label in range(labels)
+            if label not in self.merged
+        ]
+
+    def union(self, person, other):
+        """
+        Merges the components of two person indexes, the smaller into
+        the larger so chains of merged numbers stay short.
+        """
+        a, b = self.component(person), self.component(other)
+        if a == b:
+            return
+        if self.component_size(a) < self.component_size(b):
+            a, b = b, a
+        self.merged_sizes[a] = self.component_size(a) + self.component_size(b)
+        self.merged_sizes.pop(b, None)
+        self.merged[b] = a
+
+    def csr_arrays(self):
+        """
+        Returns (person_offsets, person_movies, movie_offsets,
+        movie_people) covering every person and movie, rebuilt with the
+        added rows folded in if there are any.
+        """
+        if (not self.extra_movies and self.base_people == len(self.person_ids)
+                and self.base_movies == len(self.movie_ids)):
+            return self.person_offsets, self.person_movies, self.movie_offsets, self.movie_people
+
+        rows, columns = array("i"), array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_of(person):
+                rows.append(person)
+                columns.append(movie)
+        person_offsets, person_movies = csr(rows, columns, len(self.person_ids))
+        movie_offsets, movie_people = csr(columns, rows, len(self.movie_ids))
+        return person_offsets, person_movies, movie_offsets, movie_people
+
+    def label_components(self):
+        """
+        Labels every person index with a dense component number using
+        union-find over the cast of each movie.
+
+        Returns (components, component_sizes) arrays.
+        """
+        n = len(self.person_ids)
+        parent = array("i", range(n))
+
+        def find(person):
+            while parent[person] != person:
+                parent[person] = parent[parent[person]]
+                person = parent[person]
+            return person
+
+        for movie in range(len(self.movie_ids)):
+            cast = self.cast_of(movie)
+            if len(cast) < 2:
+                continue
+            root = find(cast[0])
+            for person in cast[1:]:
+                other = find(person)
+                if other != root:
+                    parent[other] = root
+
+        components = array("i", [-1]) * n
+        component_sizes = array("i")
+        for person in range(n):
+            root = find(person)
+            if components[root] == -1:
+                components[root] = len(component_sizes)
+                component_sizes.append(0)
+            components[person] = components[root]
+            component_sizes[components[person]] += 1
+        return components, component_sizes
+
+    def shortest_path(self, source, target, deadline=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect person_id `source` to person_id `target`,
+        or None if they are not connected.
+
+        Raises TimeoutError once time.monotonic() passes `deadline`.
+        """
+        source = self.person_index[source]
+        target = self.person_index[target]
+        self.num_explored = 0
+        if source == target:
+            return []
+        parent_person, parent_movie, _ = self.bfs(source, target, deadline)
+        if parent_person[target] == -1:
+            return None
+        return self.trace(parent_person, parent_movie, target)
+
+    def bfs_tree(self, source, deadline=None):
+        """
+        Runs a complete breadth-first search from person index `source`.
+
+        Returns (parent_person, parent_movie, distance) arrays indexed by
+        person, where the source is its own parent and people the source
+        cannot reach have parent -1 and distance -1.
+        """
+        return self.bfs(source, None, deadline)
+
+    def bfs(self, source, target=None, deadline=None):
+        """
+        Breadth-first search from person index `source`, stopping as
+        soon as person index `target` is reached if one is given. Both
+        shortest_path and bfs_tree run on this.
+
+        Returns (parent_person, parent_movie, distance) arrays as for
+        bfs_tree, filled in as far as the search got.
+
+        Raises TimeoutError once time.monotonic() passes `deadline`.
+        """
+        self.num_explored = 0
+
+        # Parent arrays double as the explored set: -1 means unseen
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        distance = array("h", [-1]) * len(self.person_ids)
+        parent_person[source] = source
+        distance[source] = 0
+
+        # A movie's cast is only scanned the first time it is reached
+        seen_movies = bytearray(len(self.movie_ids))
+
+        person_offsets = self.person_offsets
+        movie_offsets = self.movie_offsets
+        person_movies = memoryview(self.person_movies)
+        movie_people = memoryview(self.movie_people)
+        base_people, extra_movies = self.base_people, self.extra_movies
+        base_movies, extra_cast = self.base_movies, self.extra_cast
+
+        queue = deque([source])
+        while queue:
+            person = queue.popleft()
+            self.num_explored += 1
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("search timed out")
+            step = distance[person] + 1
+            # Inlined movies_of and cast_of
+            movies = ()
+            if person < base_people:
+                movies = person_movies[person_offsets[person]:person_offsets[person + 1]]
+            if person in extra_movies:
+                movies = list(movies) + extra_movies[person]
+            for movie in movies:
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                cast = ()
+                if movie < base_movies:
+                    cast = movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]
+                if movie in extra_cast:
+                    cast = list(cast) + extra_cast[movie]
+                for other in cast:
+                    if parent_person[other] != -1:
+                        continue
+                    parent_person[other] = person
+                    parent_movie[other] = movie
+                    distance[other] = step
+                    if other == target:
+                        return parent_person, parent_movie, distance
+                    queue.append(other)
+        return parent_person, parent_movie, distance
+
+    def trace(self, parent_person, parent_movie, person):
+        """
+        Walks parent arrays back from `person` to the search root and
+        returns the (movie_id, person_id) path from the root to `person`.
+        """
+        path = []
+        while parent_person[person] != person:
+            path.append((self.movie_ids[parent_movie[person]], self.person_ids[person]))
+            person = parent_person[person]
+        path.reverse()
+        return path
+
+    def trace_parents(self, parents, person):
+        """
+        Like trace, for a dict mapping each reached person index to its
+        (parent person, movie) with the search root mapped to itself.
+        """
+        path = []
+        while parents[person][0] != person:
+            parent, movie = parents[person]
+            path.append((self.movie_ids[movie], self.person_ids[person]))
+            person = parent
+        path.reverse()
+        return path
+
+    def climb(self, parent_person, parent_movie, person):
+        """
+        Walks parent arrays from `person` up to the search root and
+        returns the (movie_id, person_id) path from `person` to the root,
+        which is valid because co-starring is symmetric.
+        """
+        path = []
+        while parent_person[person] != person:
+            path.append((self.movie_ids[parent_movie[person]], self.person_ids[parent_person[person]]))
+            person = parent_person[person]
+        return path
+
+
+class Extended(Sequence):
+    """
+    Read-only `base` sequence, such as a StringTable over a snapshot,
+    followed by the values appended since.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.added = []
+
+    def append(self, value):
+        self.added.append(value)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < len(self.base):
+            return self.base[i]
+        return self.added[i - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.added
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+
+class Overlay(Mapping):
+    """
+    Read-only `base` mapping, such as a SortedIndex over a snapshot, plus
+    the keys added since. With `multi`, values are lists of indexes and
+    the indexes added under a key follow those already in `base`.
+    """
+
+    def __init__(self, base, multi=False):
+        self.base = base
+        self.multi = multi
+        self.added = {}
+
+    def add(self, key, value):
+        if self.multi:
+            self.added.setdefault(key, []).append(value)
+        else:
+            self.added[key] = value
+
+    def __getitem__(self, key):
+        if key not in self.added:
+            return self.base[key]
+        if not self.multi:
+            return self.added[key]
+        return list(self.base.get(key, [])) + self.added[key]
+
+    def __contains__(self, key):
+        return key in self.added or key in self.base
+
+    def __iter__(self):
+        yield from self.base
+        for key in self.added:
+            if key not in self.base:
+                yield key
+
+    def __len__(self):
+        return len(self.base) + sum(1 for key in self.added if key not in self.base)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping of person_id to the dict load_data would have
+    built: name, birth, movies (a set of movie_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        i = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[i],
+            "birth": graph.person_births[i],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(i)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping of movie_id to the dict load_data would have
+    built: title, year, stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        i = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[i],
+            "year": graph.movie_years[i],
+            "stars": {graph.person_ids[person] for person in graph.cast_of(i)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only mapping of lowercase name to a set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        return {graph.person_ids[i] for i in graph.name_index[name]}
+
+    def __contains__(self, name):
+        return name in self.graph.name_index
+
+    def __iter__(self):
+        return iter(self.graph.name_index)
+
+    def __len__(self):
+        return len(self.graph.name_index)
+
+
+def grow(graph, column):
+    """
+    Returns the column named `column` of `graph` in a form that can be
+    appended to, wrapping read-only columns in an Extended first.
+    """
+    values = getattr(graph, column)
+    if not isinstance(values, (list, Extended)):
+        values = Extended(values)
+        setattr(graph, column, values)
+    return values
+
+
+def overlay(graph, index, multi=False):
+    """
+    Returns the index named `index` of `graph` wrapped in an Overlay,
+    so keys can be added without touching the original.
+    """
+    values = getattr(graph, index)
+    if not isinstance(values, Overlay):
+        values = Overlay(values, multi=multi)
+        setattr(graph, index, values)
+    return values
+
+
+def csr(rows, columns, size):
+    """
+    Builds CSR offsets and column arrays from parallel arrays of
+    (row, column) pairs, with `size` rows, using a counting sort.
+    """
+    offsets = array("i", [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("i", offsets[:-1])
+    values = array("i", [0]) * len(rows)
+    for row, column in zip(rows, columns):
+        values[cursor[row]] = column
+        cursor[row] += 1
+    return offsets, values
+
+
+def load_compact(directory):
+    """
+    Load data from CSV files into a CompactGraph.
+    """
+    # Load people
+    person_ids, person_names, person_births = [], [], []
+    person_index = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            person_index[row["id"]] = len(person_ids)
+            person_ids.append(row["id"])
+            person_names.append(row["name"])
+            person_births.append(row["birth"])
+
+    # Load movies
+    movie_ids, movie_titles, movie_years = [], [], []
+    movie_index = {}
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movie_index[row["id"]] = len(movie_ids)
+            movie_ids.append(row["id"])
+            movie_titles.append(row["title"])
+            movie_years.append(row["year"])
+
+    # Load stars as parallel (person, movie) index arrays
+    star_people, star_movies = array("i"), array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                person = person_index[row["person_id"]]
+                movie = movie_index[row["movie_id"]]
+            except KeyError:
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+
+    # Drop repeated rows, like the sets in load_data do
+    person_offsets, person_movies = csr(star_people, star_movies, len(person_ids))
+    star_people, star_movies = array("i"), array("i")
+    for person in range(len(person_ids)):
+        row = person_movies[person_offsets[person]:person_offsets[person + 1]]
+        for movie in sorted(set(row)):
+            star_people.append(person)
+            star_movies.append(movie)
+
+    person_offsets, person_movies = csr(star_people, star_movies, len(person_ids))
+    movie_offsets, movie_people = csr(star_movies, star_people, len(movie_ids))
+
+    return CompactGraph(
+        person_ids, person_names, person_births,
+        movie_ids, movie_titles, movie_years,
+        person_offsets, person_movies, movie_offsets, movie_people,
+        person_index=person_index, movie_index=movie_index
+    )
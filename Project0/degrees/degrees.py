@@ -1,7 +1,20 @@
+import argparse
+import atexit
 import csv
+import heapq
 import sys
-
-from util import Node, StackFrontier, QueueFrontier
+import threading
+import time
+from collections import deque
+
+import delta as deltas
+import landmarks
+import nameindex
+import parallel
+import snapshot as snapshots
+from compact import load_compact
+from treecache import TreeCache
+from util import Node, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +25,103 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the number of their connected component
+components = {}
+
+# Maps component numbers merged by a delta to the number they were
+# merged into, see component_of
+merged_components = {}
+
+# Maps the numbers of components not merged into another to their
+# number of people
+component_counts = {}
+
+# CompactGraph backing people, movies and names when loaded with compact=True
+graph = None
+
+# LRU cache of complete BFS trees over `graph`, used by the cached engine
+tree_cache = None
+
+# Memory budget in bytes for tree_cache
+TREE_CACHE_BUDGET = 256 * 2 ** 20
+
+# Landmark index over `graph` used by the landmarks engine, built on first use
+landmark_index = None
+
+# Number of landmarks picked when building landmark_index
+LANDMARKS = 16
+
+# ParallelSearch over `graph` used by the parallel engine, started on first use
+parallel_search = None
+
+# Worker processes of parallel_search (None for one per core), and the
+# BFS level size below which it expands levels serially instead
+PARALLEL_WORKERS = None
+PARALLEL_THRESHOLD = 4096
+
+# NameIndex over `names` used by rank_people, built on first use
+name_index = None
+
+# Lowercase names of the people added by deltas since the data was loaded
+added_names = []
+
+# Ways person_id_for_name may resolve a name, see its docstring
+POLICIES = ("ask", "best", "unique")
+
+# Directory the data was last loaded from
+data_directory = None
+
+# Number of people expanded by the most recent search
+num_explored = 0
+
+# Held while landmark_index, name_index or parallel_search is built or
+# started, so threads that first need one at the same time build it once
+builders = threading.Lock()
+
+# Per-thread search limits: `deadline` is a time.monotonic() value
+# after which a running search gives up, see check_deadline
+limits = threading.local()
 
-def load_data(directory):
+
+def load_data(directory, compact=False, snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the data is held in an integer-indexed CompactGraph
+    and people, movies and names become read-only views over it. The
+    graph is then mapped from the directory's snapshot file when it is
+    current, and the snapshot is rebuilt when it is not, unless
+    `snapshot` is False. Without `compact`, a current snapshot is still
+    mapped rather than parsing the CSVs, but none is built.
+
+    Either way, the deltas journaled by apply_delta for these CSV files
+    are then applied again.
     """
+    global data_directory, graph, people, movies, names, tree_cache, landmark_index, name_index
+    data_directory = directory
+    tree_cache = None
+    landmark_index = None
+    name_index = None
+    added_names.clear()
+    close_parallel()
+    graph = None
+    if compact and snapshot:
+        graph = snapshots.load_or_build(directory)
+    elif compact:
+        graph = load_compact(directory)
+    elif snapshot:
+        graph = snapshots.load(directory)
+    if graph is not None:
+        people, movies, names = graph.people, graph.movies, graph.names
+        tree_cache = TreeCache(graph, budget=TREE_CACHE_BUDGET)
+        for changes in deltas.replay(directory):
+            apply_changes(changes)
+        return
+
+    # Start from fresh dicts, so reloading never mixes in rows of the
+    # data loaded before
+    people, movies, names = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,44 +156,430 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    label_components()
+    for changes in deltas.replay(directory):
+        apply_changes(changes)
+
+
+def apply_delta(directory, record=True):
+    """
+    Adds the new people, movies and star rows in the delta `directory`
+    (see delta.read_delta) to the loaded data, and with `record`, to the
+    dataset's journal so later loads and snapshots include them.
+
+    Only the delta is read: components are merged as star rows join
+    them, cached BFS trees the new rows could change are dropped, and
+    the landmark table and parallel workers are rebuilt on next use.
+    Returns the number of new star rows.
+    """
+    changes = deltas.read_delta(directory)
+    count = apply_changes(changes)
+    if record:
+        deltas.record(data_directory, changes)
+    return count
+
+
+def apply_changes(changes):
+    """
+    Adds the rows of a delta read by delta.read_delta to the loaded data
+    and returns the number of new star rows. Star rows naming unknown
+    people or movies are skipped, like in load_data.
+    """
+    global landmark_index
+    new_names = [
+        row["name"].lower() for row in changes["people"]
+        if row["id"] not in people
+    ]
+
+    if graph is not None:
+        stars = graph.apply(changes)
+        tree_cache.invalidate(stars)
+        if stars or changes["people"] or changes["movies"]:
+            close_parallel()
+    else:
+        stars = []
+        for row in changes["people"]:
+            if row["id"] in people:
+                continue
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+            components[row["id"]] = len(components)
+            component_counts[components[row["id"]]] = 1
+        for row in changes["movies"]:
+            if row["id"] not in movies:
+                movies[row["id"]] = {
+                    "title": row["title"],
+                    "year": row["year"],
+                    "stars": set()
+                }
+        for row in changes["stars"]:
+            person_id, movie_id = row["person_id"], row["movie_id"]
+            if person_id not in people or movie_id not in movies:
+                continue
+            cast = movies[movie_id]["stars"]
+            if person_id in cast:
+                continue
+            if cast:
+                merge_components(person_id, next(iter(cast)))
+            people[person_id]["movies"].add(movie_id)
+            cast.add(person_id)
+            stars.append((person_id, movie_id))
+
+    if stars:
+        landmark_index = None
+    with builders:
+        added_names.extend(new_names)
+        if name_index is not None:
+            for name in new_names:
+                name_index.add(name)
+    return len(stars)
+
+
+def label_components():
+    """
+    Labels every person with the number of their connected component,
+    using union-find over the cast of each movie, so people in different
+    components are known not to be connected without a search.
+    """
+    parent = {person_id: person_id for person_id in people}
+
+    def find(person_id):
+        while parent[person_id] != person_id:
+            parent[person_id] = parent[parent[person_id]]
+            person_id = parent[person_id]
+        return person_id
+
+    for movie in movies.values():
+        stars = iter(movie["stars"])
+        first = next(stars, None)
+        if first is None:
+            continue
+        root = find(first)
+        for person_id in stars:
+            other = find(person_id)
+            if other != root:
+                parent[other] = root
+
+    components.clear()
+    merged_components.clear()
+    component_counts.clear()
+    labels = {}
+    for person_id in people:
+        label = labels.setdefault(find(person_id), len(labels))
+        components[person_id] = label
+        component_counts[label] = component_counts.get(label, 0) + 1
+
+
+def component_of(person_id):
+    """
+    Returns the connected component number of a person.
+    """
+    if graph is not None:
+        return graph.component(graph.person_index[person_id])
+    label = components[person_id]
+    while label in merged_components:
+        label = merged_components[label]
+    return label
+
+
+def merge_components(person_id, other_id):
+    """
+    Merges the components of two people after a delta connects them,
+    the smaller into the larger so chains of merged numbers stay short.
+    """
+    label, other = component_of(person_id), component_of(other_id)
+    if label == other:
+        return
+    if component_counts[label] < component_counts[other]:
+        label, other = other, label
+    component_counts[label] += component_counts.pop(other)
+    merged_components[other] = label
+
+
+def component_sizes():
+    """
+    Returns a list of the number of people in each component.
+    """
+    if graph is not None:
+        return graph.component_size_list()
+    return list(component_counts.values())
+
+
+def component_report():
+    """
+    Prints a summary of the connected components of the data.
+    """
+    sizes = sorted(component_sizes(), reverse=True)
+    total = sum(sizes)
+    print(f"{len(sizes)} components over {total} people.")
+    for rank, size in enumerate(sizes[:10]):
+        share = size / total if total else 0
+        print(f"{rank + 1}: {size} people ({share:.1%})")
+    print(f"{sizes.count(1)} people share no movie with anyone.")
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "small"
+    global LANDMARKS, PARALLEL_WORKERS, PARALLEL_THRESHOLD
+    parser = argparse.ArgumentParser(description="Degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--engine", choices=ENGINES, default="bfs",
+                        help="search strategy used to find the path")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the graph in integer-indexed CSR arrays, "
+                             "snapshotted for the next run")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="parse the CSVs even if a current snapshot exists, "
+                             "which is otherwise used by every engine")
+    parser.add_argument("--cache-mb", type=int, default=TREE_CACHE_BUDGET // 2 ** 20,
+                        help="memory budget of the cached engine's BFS trees")
+    parser.add_argument("--landmarks", type=int, default=LANDMARKS,
+                        help="number of landmarks used by the landmarks engine")
+    parser.add_argument("--delta", action="append", default=[], metavar="DIRECTORY",
+                        help="apply and journal the new rows in a delta directory (repeatable)")
+    parser.add_argument("--components", action="store_true",
+                        help="print a connected component report and exit")
+    parser.add_argument("--policy", choices=POLICIES, default="ask",
+                        help="how names are resolved to people")
+    parser.add_argument("--all", action="store_true",
+                        help="print every shortest path instead of one")
+    parser.add_argument("--k", type=int, default=None,
+                        help="print the k shortest paths (Yen's algorithm)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes of the parallel engine")
+    parser.add_argument("--parallel-threshold", type=int, default=PARALLEL_THRESHOLD,
+                        help="BFS level size below which the parallel engine runs serially")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact or args.engine in COMPACT_ENGINES,
+              snapshot=not args.no_snapshot)
+    if tree_cache is not None:
+        tree_cache.budget = args.cache_mb * 2 ** 20
+    LANDMARKS = args.landmarks
+    PARALLEL_WORKERS = args.workers
+    PARALLEL_THRESHOLD = args.parallel_threshold
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    for directory in args.delta:
+        count = apply_delta(directory)
+        print(f"Applied {directory}: {count} new star rows.")
+
+    if args.components:
+        component_report()
+        return
+
+    source = person_id_for_name(input("Name: "), policy=args.policy)
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_id_for_name(input("Name: "), policy=args.policy)
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.all or args.k:
+        if args.all:
+            paths = all_shortest_paths(source, target)
+        else:
+            paths = k_shortest_paths(source, target, args.k)
+        count = 0
+        for count, path in enumerate(paths, 1):
+            print(f"Path {count}:")
+            print_path(source, path)
+        if count == 0:
+            print("Not connected.")
+        return
+
+    path = shortest_path(source, target, engine=args.engine)
 
     if path is None:
         print("Not connected.")
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
 
+def print_path(source, path):
+    """
+    Prints the degrees of separation of a path and each of its steps.
+    """
+    degrees = len(path)
+    print(f"{degrees} degrees of separation.")
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+
+def shortest_path(source, target, engine="bfs"):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
 
-def shortest_path(source, target):
-    """source = person_id_for_name(input("Name: "))"""
-    """target = person_id_for_name(input("Name: "))"""
+    If no possible path, returns None.
 
+    `engine` names the search strategy to use, one of ENGINES.
+    People in different components are answered without a search.
+    """
+    global num_explored
+    if component_of(source) != component_of(target):
+        num_explored = 0
+        return None
+    return ENGINES[engine](source, target)
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, one at a time.
+
+    A breadth-first search records, for each person, every (movie_id,
+    person_id) step from the previous level that reaches them, which
+    forms a DAG of shortest-path predecessors. Paths are then walked
+    back from the target depth-first, so only the DAG and the current
+    path are ever held in memory, however many paths there are.
+    """
+    if source == target:
+        yield []
+        return
+    if component_of(source) != component_of(target):
+        return
+
+    # Maps each reached person to their steps from the previous level
+    predecessors = {source: []}
+    frontier = [source]
+    while frontier and target not in predecessors:
+        level = {}
+        for person_id in frontier:
+            check_deadline()
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in predecessors:
+                    level.setdefault(neighbor_id, []).append((movie_id, person_id))
+        predecessors.update(level)
+        frontier = list(level)
+    if target not in predecessors:
+        return
+
+    # Depth-first walk from the target; `stack` holds an iterator over
+    # the remaining predecessors of each person on the current path
+    path = []
+    stack = [iter(predecessors[target])]
+    people_on_path = [target]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            people_on_path.pop()
+            if path:
+                path.pop()
+            continue
+        movie_id, parent_id = step
+        path.append((movie_id, people_on_path[-1]))
+        if parent_id == source:
+            yield path[::-1]
+            path.pop()
+            continue
+        people_on_path.append(parent_id)
+        stack.append(iter(predecessors[parent_id]))
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yields up to `k` (or all, if None) loopless lists of (movie_id,
+    person_id) pairs from the source to the target, shortest first,
+    using Yen's algorithm.
+
+    Each new path deviates from an earlier one at some spur person: the
+    prefix up to the spur is kept, the steps earlier paths took out of
+    the spur with the same prefix are banned, as are the prefix's other
+    people, and the rest is the shortest remaining path from the spur.
+    """
+    first = restricted_path(source, target, set(), set())
+    if first is None:
+        return
+    found = [first]
+    seen = {tuple(first)}
+    candidates = []
+    counter = 0
+    while True:
+        yield found[-1]
+        if k is not None and len(found) >= k:
+            return
+
+        previous = found[-1]
+        people_on_path = [source] + [person_id for _, person_id in previous]
+        for i in range(len(previous)):
+            spur = people_on_path[i]
+            root = previous[:i]
+            banned_steps = {
+                (spur,) + path[i]
+                for path in found if path[:i] == root
+            }
+            banned_people = set(people_on_path[:i])
+            spur_path = restricted_path(spur, target, banned_people, banned_steps)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heapq.heappush(candidates, (len(candidate), counter, candidate))
+                counter += 1
+
+        if not candidates:
+            return
+        found.append(heapq.heappop(candidates)[2])
+
+
+def restricted_path(source, target, banned_people, banned_steps):
+    """
+    Returns a shortest list of (movie_id, person_id) pairs from source
+    to target that visits none of `banned_people` and takes no
+    (person_id, movie_id, person_id) step in `banned_steps`, or None.
+    """
+    if source == target:
+        return []
+    parents = {source: None}
+    frontier = [source]
+    while frontier:
+        next_frontier = []
+        for person_id in frontier:
+            check_deadline()
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in parents or neighbor_id in banned_people:
+                    continue
+                if (person_id, movie_id, neighbor_id) in banned_steps:
+                    continue
+                parents[neighbor_id] = (movie_id, person_id)
+                if neighbor_id == target:
+                    return trace_parents(parents, target)
+                next_frontier.append(neighbor_id)
+        frontier = next_frontier
+    return None
+
+
+def trace_parents(parents, person_id):
+    """
+    Returns the (movie_id, person_id) path to `person_id` from the root
+    of a search whose `parents` map each reached person to the
+    (movie_id, person_id) step they were reached by, and the root to None.
+    """
+    path = []
+    while parents[person_id] is not None:
+        movie_id, parent_id = parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+    return path
+
+
+def breadth_first_path(source, target):
     """Finds a solution to Baconator, if one exists."""
+    global num_explored
+    num_explored = 0
 
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
@@ -103,11 +594,12 @@ def shortest_path(source, target):
 
             # If nothing left in frontier, then no path
             if frontier.empty():
-                print('None')
-                sys.exit()
+                return None
 
             # Choose a node from the frontier
             node = frontier.remove()
+            num_explored += 1
+            check_deadline()
 
             #determine neighbors to node
             neighbors = neighbors_for_person(node.state)
@@ -136,71 +628,268 @@ def shortest_path(source, target):
                     frontier.add(child)
 
 
+def bidirectional_path(source, target):
+    """
+    Finds the same shortest path as breadth_first_path, but grows
+    one breadth-first search from the source and another from the
+    target, always expanding whichever frontier is smaller, and
+    stitches the two halves together where they meet.
+    """
+    global num_explored
+    num_explored = 0
+
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) step
+    # leading back towards the end that search started from
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(forward_frontier, forward, backward)
+        else:
+            backward_frontier, meeting = expand_level(backward_frontier, backward, forward)
+
+        # Every meeting found within one level gives the same length,
+        # so the first one is already a shortest path
+        if meeting is not None:
+            path = []
+            person_id = meeting
+            while forward[person_id] is not None:
+                movie_id, parent_id = forward[person_id]
+                path.append((movie_id, person_id))
+                person_id = parent_id
+            path.reverse()
 
+            person_id = meeting
+            while backward[person_id] is not None:
+                movie_id, person_id = backward[person_id]
+                path.append((movie_id, person_id))
+            return path
+
+    return None
+
+
+def bipartite_path(source, target):
     """
-    Returns the shortest list of (movie_id, person_id) pairs
-    that connect the source to the target.
+    Finds a shortest path with a breadth-first search over the bipartite
+    person-movie graph. A movie's cast is scanned only the first time
+    the movie is reached: its whole cast is then at most one step
+    further away, so scanning it again from a later co-star can't find
+    anyone new. Every star row is visited at most once, instead of once
+    per co-star expanded, and no neighbor sets are built.
+    """
+    global num_explored
+    num_explored = 0
+    if source == target:
+        return []
+
+    parents = {source: None}
+    seen_movies = set()
+    queue = deque([source])
+    while queue:
+        person_id = queue.popleft()
+        num_explored += 1
+        check_deadline()
+        for movie_id in people[person_id]["movies"]:
+            if movie_id in seen_movies:
+                continue
+            seen_movies.add(movie_id)
+            for star_id in movies[movie_id]["stars"]:
+                if star_id in parents:
+                    continue
+                parents[star_id] = (movie_id, person_id)
+                if star_id == target:
+                    return trace_parents(parents, target)
+                queue.append(star_id)
+    return None
+
+
+def compact_path(source, target):
+    """
+    Finds a shortest path with a breadth-first search over the
+    CompactGraph arrays, which needs load_data(..., compact=True).
+    """
+    global num_explored
+    if graph is None:
+        raise Exception("compact engine needs load_data(directory, compact=True)")
+    path = graph.shortest_path(source, target, deadline=getattr(limits, "deadline", None))
+    num_explored = graph.num_explored
+    return path
 
-    If no possible path, returns None.
+
+def cached_path(source, target):
     """
+    Finds a shortest path from a cached BFS tree rooted at the source or
+    the target, building and caching the source's complete tree when
+    neither is cached. Needs load_data(..., compact=True).
+    """
+    global num_explored
+    if tree_cache is None:
+        raise Exception("cached engine needs load_data(directory, compact=True)")
+    path = tree_cache.shortest_path(source, target, deadline=getattr(limits, "deadline", None))
+    num_explored = graph.num_explored
+    return path
 
-    # TODO
-    raise NotImplementedError
 
-class Node():
-    def __init__(self, state, parent, action):
-        self.state = state
-        self.parent = parent
-        self.action = action
+def landmark_path(source, target):
+    """
+    Finds a shortest path with A* search guided by landmark distance
+    bounds, loading or building the landmark table on first use.
+    Needs load_data(..., compact=True).
+    """
+    global num_explored
+    path = load_landmarks().shortest_path(
+        source, target, deadline=getattr(limits, "deadline", None)
+    )
+    num_explored = graph.num_explored
+    return path
 
 
-class StackFrontier():
-    def __init__(self):
-        self.frontier = []
-        """Creates empty frontier in form of list"""
+def parallel_path(source, target):
+    """
+    Finds a shortest path with a level-synchronous BFS whose large
+    levels are split across a pool of worker processes reading the
+    graph from shared memory. Needs load_data(..., compact=True).
+    """
+    global num_explored, parallel_search
+    if graph is None:
+        raise Exception("parallel engine needs load_data(directory, compact=True)")
+    if parallel_search is None:
+        with builders:
+            if parallel_search is None:
+                parallel_search = parallel.ParallelSearch(
+                    graph, workers=PARALLEL_WORKERS, threshold=PARALLEL_THRESHOLD
+                )
+    path = parallel_search.shortest_path(
+        source, target, deadline=getattr(limits, "deadline", None)
+    )
+    num_explored = parallel_search.num_explored
+    return path
+
+
+@atexit.register
+def close_parallel():
+    """
+    Stops the parallel engine's workers and frees its shared memory.
+    """
+    global parallel_search
+    if parallel_search is not None:
+        parallel_search.close()
+        parallel_search = None
 
-    def add(self, node):
-        self.frontier.append(node)
-        """Appends frontier by adding node to end of list"""
 
-    def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
-        """checks if frontier contains particular state"""
+def load_landmarks():
+    """
+    Returns the landmark index for the loaded graph, loading it from
+    next to the dataset or building and saving it if needed.
+    """
+    global landmark_index
+    if graph is None:
+        raise Exception("landmarks need load_data(directory, compact=True)")
+    if landmark_index is None:
+        with builders:
+            if landmark_index is None:
+                landmark_index = landmarks.load_or_build(graph, data_directory, k=LANDMARKS)
+    return landmark_index
 
-    def empty(self):
-        return len(self.frontier) == 0
-        """Checks if frontieer is empty"""
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
-        """Removes last item from list (Stack Frontier,
-            last in, first out)"""
+def degree_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person_ids from the landmark table alone, without a search.
+    Both are math.inf if they are not connected; upper is math.inf if
+    no landmark gives an upper bound.
+    """
+    index = load_landmarks()
+    return index.bounds(graph.person_index[source], graph.person_index[target])
 
 
-class QueueFrontier(StackFrontier):
+def distances_from(source):
+    """
+    Returns a dict mapping every person_id reachable from `source`
+    to their degrees of separation from `source`, in one search.
+    """
+    if tree_cache is not None:
+        return tree_cache.distances_from(source, deadline=getattr(limits, "deadline", None))
+
+    distances = {source: 0}
+    frontier = [source]
+    degree = 0
+    while frontier:
+        degree += 1
+        next_frontier = []
+        for person_id in frontier:
+            check_deadline()
+            for _, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in distances:
+                    distances[neighbor_id] = degree
+                    next_frontier.append(neighbor_id)
+        frontier = next_frontier
+    return distances
+
+
+def expand_level(frontier, parents, others):
+    """
+    Expands every person in `frontier` by one step, recording how each
+    new person was reached in `parents`.
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
-        """Removes first item from list (Queue frontier,
-            first in, first out)"""
+    Returns the next frontier and the first person also reached by the
+    opposite search (`others`), or None if the searches have not met.
+    """
+    global num_explored
+    next_frontier = []
+    for person_id in frontier:
+        num_explored += 1
+        check_deadline()
+        for movie_id, neighbor_id in neighbors_for_person(person_id):
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (movie_id, person_id)
+            if neighbor_id in others:
+                return next_frontier, neighbor_id
+            next_frontier.append(neighbor_id)
+    return next_frontier, None
+
+
+def check_deadline():
+    """
+    Raises TimeoutError if the current thread's search deadline,
+    if any, has passed.
+    """
+    deadline = getattr(limits, "deadline", None)
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError("search timed out")
 
 
-def person_id_for_name(name):
+def person_id_for_name(name, policy="ask"):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    `policy` is one of POLICIES:
+        - "ask": exact names only, prompting when several people share it
+        - "best": the top ranked candidate of rank_people, never prompting
+        - "unique": an exact name held by one person, or else the only
+          prefix or typo-tolerant candidate; None when still ambiguous
     """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy}")
+
+    if policy == "best":
+        candidates = rank_people(name, limit=1)
+        return candidates[0] if candidates else None
+
     person_ids = list(names.get(name.lower(), set()))
+    if policy == "unique":
+        if not person_ids:
+            person_ids = rank_people(name, limit=2)
+        return person_ids[0] if len(person_ids) == 1 else None
+
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
@@ -221,6 +910,41 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def rank_people(name, limit=10):
+    """
+    Returns up to `limit` person_ids ranked as matches for `name`:
+    people with exactly that name, then people whose name starts with
+    it, then people whose name is a close misspelling of it. People
+    sharing a name are ranked by how many movies they starred in.
+    """
+    ranked = []
+    for key in load_name_index().search(name, limit=limit):
+        person_ids = sorted(names.get(key, set()),
+                            key=lambda person_id: -len(people[person_id]["movies"]))
+        ranked.extend(person_ids[:limit - len(ranked)])
+        if len(ranked) == limit:
+            break
+    return ranked
+
+
+def load_name_index():
+    """
+    Returns the prefix and typo-tolerant name index for the loaded data,
+    mapping it from next to the dataset or building and saving it on
+    first use.
+    """
+    global name_index
+    if name_index is None:
+        with builders:
+            if name_index is None:
+                # Only published once complete, for threads that skip the lock
+                index = nameindex.load_or_build(names, data_directory)
+                for name in added_names:
+                    index.add(name)
+                name_index = index
+    return name_index
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
@@ -234,5 +958,20 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+# Search strategies available to shortest_path
+ENGINES = {
+    "bfs": breadth_first_path,
+    "bidirectional": bidirectional_path,
+    "bipartite": bipartite_path,
+    "compact": compact_path,
+    "cached": cached_path,
+    "landmarks": landmark_path,
+    "parallel": parallel_path,
+}
+
+# Engines that only run over a CompactGraph
+COMPACT_ENGINES = {"compact", "cached", "landmarks", "parallel"}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+"""
+Incremental updates to a dataset.
+
+A delta is a directory holding any of people.csv, movies.csv and
+stars.csv in the dataset's own format, listing only new rows. Applied
+deltas are appended to a journal next to the dataset, one JSON line
+each after a header naming the CSV files they were applied on top of,
+and replayed after every load. The snapshot, and the component labels
+inside it, are therefore never rebuilt for a delta: loading costs the
+snapshot map plus time proportional to the journal. The journal is
+dropped, like a snapshot, once the CSV files themselves change.
+"""
+
+import csv
+import json
+import os
+
+from snapshot import SOURCES, source_stamp
+
+JOURNAL_NAME = "degrees.journal"
+
+# Delta keys and the CSV file each is read from
+FILES = {
+    "people": "people.csv",
+    "movies": "movies.csv",
+    "stars": "stars.csv",
+}
+
+
+def read_delta(directory):
+    """
+    Returns the rows of each CSV file in the delta `directory` as lists
+    of dicts, keyed "people", "movies" and "stars". Missing files give
+    no rows.
+    """
+    if not any(os.path.exists(os.path.join(directory, name)) for name in SOURCES):
+        raise Exception(f"no people.csv, movies.csv or stars.csv in {directory}")
+    changes = {}
+    for key, name in FILES.items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            changes[key] = []
+            continue
+        with open(path, encoding="utf-8") as f:
+            changes[key] = list(csv.DictReader(f))
+    return changes
+
+
+def journal_stamp(directory):
+    """
+    Returns the source stamp of `directory` extended with the size and
+    modification time of its journal, which indexes built over the
+    updated data (rather than the CSVs alone) must match.
+    """
+    stamp = source_stamp(directory)
+    try:
+        info = os.stat(os.path.join(directory, JOURNAL_NAME))
+    except OSError:
+        return stamp
+    stamp[JOURNAL_NAME] = [info.st_size, info.st_mtime_ns]
+    return stamp
+
+
+def replay(directory, stamp=None):
+    """
+    Yields the deltas journaled for the dataset in `directory`, oldest
+    first, or nothing if there is no journal or it was recorded over
+    other CSV files.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+    try:
+        f = open(os.path.join(directory, JOURNAL_NAME), encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        header = f.readline()
+        if not header or json.loads(header)["sources"] != stamp:
+            return
+        for line in f:
+            # A line cut short by a crash while appending is ignored
+            if line.endswith("\n"):
+                yield json.loads(line)
+
+
+def record(directory, changes, stamp=None):
+    """
+    Appends a delta to the journal of the dataset in `directory`,
+    starting a new journal if the current one was recorded over other
+    CSV files.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+    path = os.path.join(directory, JOURNAL_NAME)
+    current = False
+    try:
+        with open(path, encoding="utf-8") as f:
+            header = f.readline()
+            current = header.endswith("\n") and json.loads(header)["sources"] == stamp
+    except OSError:
+        pass
+
+    with open(path, "a" if current else "w", encoding="utf-8") as f:
+        if not current:
+            f.write(json.dumps({"sources": stamp}) + "\n")
+        f.write(json.dumps(changes) + "\n")
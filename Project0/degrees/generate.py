@@ -0,0 +1,201 @@
+"""
+Generates synthetic degrees datasets at any scale.
+
+Writes people.csv, movies.csv and stars.csv in the exact format of the
+shipped data, so every loader and engine runs on them unchanged. Like
+the real IMDb data, the co-star graph is heavy-tailed: how many movies
+a person appears in follows a power law (a few prolific actors, a long
+tail of one-film actors), and so do cast sizes up to a realistic
+maximum, and some people have no credits at all. Output is streamed,
+so datasets with tens of millions of star rows only need memory for
+the movies' weights and cast sizes.
+
+Usage: python generate.py DIRECTORY --people 100000 --movies 40000 --stars 500000
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+from array import array
+
+FIRST = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Daniel",
+    "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Margaret",
+    "Donald", "Sandra", "Steven", "Ashley", "Paul", "Kimberly", "Andrew",
+    "Emily", "Joshua", "Donna", "Kevin", "Michelle", "Brian", "Carol",
+    "George", "Amanda", "Edward", "Melissa", "Ronald", "Deborah", "Timothy",
+    "Stephanie", "Jason", "Rebecca", "Jeffrey", "Laura", "Ryan", "Helen",
+    "Jacob", "Sharon", "Gary", "Cynthia",
+]
+
+LAST = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
+    "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green",
+    "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+    "Carter", "Roberts", "Gomez", "Phillips", "Evans", "Turner", "Diaz",
+    "Parker", "Cruz", "Edwards", "Collins", "Reyes",
+]
+
+WORDS = [
+    "Night", "River", "Last", "Secret", "City", "Dark", "Summer", "Love",
+    "War", "Home", "Road", "Star", "Lost", "Silent", "Golden", "Island",
+    "Storm", "Heart", "Dream", "Fire", "Shadow", "Winter", "King", "Ghost",
+    "Wild", "Blue", "Broken", "Hidden", "Crown", "Return",
+]
+
+# Largest cast a movie gets, by default
+MAX_CAST = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic degrees dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=40000)
+    parser.add_argument("--stars", type=int, default=500000,
+                        help="approximate number of star rows (edges)")
+    parser.add_argument("--alpha", type=float, default=2.0,
+                        help="power law exponent of how many movies people star in (> 1)")
+    parser.add_argument("--max-cast", type=int, default=MAX_CAST,
+                        help="most people starring in any one movie")
+    parser.add_argument("--uncredited", type=float, default=0.05,
+                        help="fraction of people who star in no movie")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    count = generate(args.directory, args.people, args.movies, args.stars,
+                     alpha=args.alpha, max_cast=args.max_cast,
+                     uncredited=args.uncredited, seed=args.seed)
+    print(f"Wrote {args.people} people, {args.movies} movies and {count} star rows.")
+
+
+def generate(directory, people, movies, stars, alpha=2.0, max_cast=MAX_CAST,
+             uncredited=0.05, seed=0):
+    """
+    Writes a dataset of `people` people, `movies` movies and about
+    `stars` star rows into `directory`, with at most `max_cast` people
+    in any movie and about an `uncredited` fraction of people in none.
+
+    Person ids count up from 1 and movie ids from 1000001, so the two
+    never collide. Returns the number of star rows written: about
+    `stars`, a little less since a movie drawn twice for one person is
+    kept once and a movie drawn once its cast is full is dropped.
+    """
+    if people < 1 or movies < 1:
+        raise Exception("need at least one person and one movie")
+    if alpha <= 1:
+        raise Exception("alpha must be greater than 1")
+    if not 0 <= uncredited < 1:
+        raise Exception("uncredited must be at least 0 and less than 1")
+    if stars > movies * max_cast:
+        raise Exception(f"{stars} star rows don't fit in {movies} casts of at most {max_cast}")
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8") as f:
+        f.write("id,name,birth\n")
+        for person in range(1, people + 1):
+            name = person_name(rng)
+            # Like the real data, some people have no known birth year
+            birth = "" if rng.random() < 0.2 else rng.randint(1900, 2010)
+            f.write(f"{person},{quote(name)},{birth}\n")
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8") as f:
+        f.write("id,title,year\n")
+        for movie in range(1, movies + 1):
+            f.write(f"{1000000 + movie},{quote(movie_title(rng, movie))},{rng.randint(1920, 2024)}\n")
+
+    # Movie i is drawn with weight 1 / rank, with ranks shuffled so big
+    # casts are spread over the id range, which makes cast sizes
+    # heavy-tailed. Ranks up to `top` share the weight of rank `top`, so
+    # no movie expects more than max_cast people
+    top = top_rank(movies, stars, max_cast)
+    ranks = list(range(1, movies + 1))
+    rng.shuffle(ranks)
+    weights = array("d", itertools.accumulate(1 / max(rank, top) for rank in ranks))
+    del ranks
+    cast = array("I", bytes(4 * movies))
+
+    # Movies per credited person follow a Pareto law with exponent
+    # `alpha`, scaled to the requested mean, and each of them draws at
+    # least one movie
+    credited = max(1, round(people * (1 - uncredited)))
+    mean = max(stars / credited, 1)
+    scale = mean * (alpha - 1) / alpha
+
+    count = 0
+    movie_ids = range(movies)
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8") as f:
+        f.write("person_id,movie_id\n")
+        for person in range(1, people + 1):
+            if rng.random() < uncredited:
+                continue
+            size = min(movies, max(1, round(scale * rng.paretovariate(alpha))))
+            starred = set(rng.choices(movie_ids, cum_weights=weights, k=size))
+
+            # Drawing a movie whose cast is already full drops it
+            starred = sorted(movie for movie in starred if cast[movie] < max_cast)
+            for movie in starred:
+                cast[movie] += 1
+            f.writelines(f"{person},{1000001 + movie}\n" for movie in starred)
+            count += len(starred)
+    return count
+
+
+def top_rank(movies, stars, max_cast):
+    """
+    Returns the least rank `top` such that, when ranks below it are
+    drawn as often as rank `top`, the biggest cast of `stars` star rows
+    over `movies` movies drawn by weight 1 / rank is expected to be at
+    most max_cast.
+    """
+    # With ranks capped at top the weights sum to 1 + H(movies) - H(top),
+    # where H is the harmonic series
+    tail = math.fsum(1 / rank for rank in range(1, movies + 1))
+    for top in range(1, movies + 1):
+        tail -= 1 / top
+        if stars / top <= max_cast * (1 + tail):
+            return top
+    return movies
+
+
+def person_name(rng):
+    """
+    Returns a random full name. Names repeat, as they do in the real
+    data, more often the larger the dataset.
+    """
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    if rng.random() < 0.5:
+        return f"{first} {chr(rng.randint(65, 90))}. {last}"
+    return f"{first} {last}"
+
+
+def movie_title(rng, movie):
+    """
+    Returns a title for movie number `movie`.
+    """
+    title = f"{rng.choice(WORDS)} {rng.choice(WORDS)}"
+    if rng.random() < 0.3:
+        title = f"The {title}"
+    if movie % 7 == 0:
+        title = f"{title} {movie % 5 + 2}"
+    return title
+
+
+def quote(text):
+    """
+    Returns `text` as a quoted CSV field.
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Landmark (ALT) index over a CompactGraph.
+
+A few landmark people are picked and the exact BFS distance from each
+landmark to every person is stored, one byte per person per landmark.
+By the triangle inequality, for any landmark l
+
+    |d(l, s) - d(l, t)|  <=  d(s, t)  <=  d(l, s) + d(l, t)
+
+so the table bounds the degrees of separation of any pair without a
+search, and the lower bound is a consistent A* heuristic. The table
+is saved next to the dataset and reused while the CSVs and the delta
+journal are unchanged, since new star rows can shorten distances.
+"""
+
+import heapq
+import math
+import os
+import time
+from array import array
+
+from delta import journal_stamp
+from snapshot import read_file, write_file
+
+MAGIC = b"DEGLMKS\0"
+VERSION = 3
+LANDMARKS_NAME = "degrees.landmarks"
+
+# Distance byte for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Distances this large or larger are stored as FAR and give no bound
+FAR = 254
+
+# Components smaller than this get no landmark of their own (unless one
+# is the largest): a search inside one is cheap anyway, and real casts
+# leave many tiny components that would each use up a landmark
+MIN_COMPONENT = 100
+
+# Landmarks an A* search consults
+ACTIVE = 4
+
+
+class LandmarkIndex():
+
+    def __init__(self, graph, landmarks, distances):
+        """
+        Wrap a table where distances[l * n + p] is the distance from
+        landmarks[l] to person index p, with n people in `graph`.
+        """
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+        self.size = len(graph.person_ids)
+
+    def column(self, person):
+        """
+        Returns the distance from every landmark to person index `person`.
+        """
+        n = self.size
+        return [self.distances[l * n + person] for l in range(len(self.landmarks))]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation of
+        person indexes `source` and `target`. Both are math.inf when the
+        two are in different components; upper is math.inf when no
+        landmark reaches them.
+        """
+        if source == target:
+            return 0, 0
+        if self.graph.component(source) != self.graph.component(target):
+            return math.inf, math.inf
+        lower, upper = 1, math.inf
+        for ds, dt in zip(self.column(source), self.column(target)):
+            if (ds == UNREACHABLE) != (dt == UNREACHABLE):
+                return math.inf, math.inf
+            if ds >= FAR or dt >= FAR:
+                continue
+            lower = max(lower, abs(ds - dt))
+            upper = min(upper, ds + dt)
+        return lower, upper
+
+    def shortest_path(self, source, target, deadline=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs from
+        person_id `source` to person_id `target`, or None, found by A*
+        with the landmark lower bound as its heuristic.
+
+        Raises TimeoutError once time.monotonic() passes `deadline`.
+        """
+        graph = self.graph
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+        graph.num_explored = 0
+        if source == target:
+            return []
+        if self.bounds(source, target)[0] == math.inf:
+            return None
+
+        n = self.size
+        distances = self.distances
+        column = self.column(source)
+        goal = [
+            (l * n, dt) for l, dt in enumerate(self.column(target))
+            if dt < FAR and column[l] < FAR
+        ]
+        # Only the landmarks that bound the source best are consulted,
+        # as every lookup is paid for each person generated
+        goal.sort(key=lambda entry: abs(distances[entry[0] + source] - entry[1]), reverse=True)
+        goal = goal[:ACTIVE]
+
+        def heuristic(person):
+            # Anyone but the target is at least one step away
+            h = 1
+            for offset, dt in goal:
+                dp = distances[offset + person]
+                if dp < FAR:
+                    if dp - dt > h:
+                        h = dp - dt
+                    elif dt - dp > h:
+                        h = dt - dp
+            return h
+
+        # Parent and cost arrays as in CompactGraph.bfs, where a cost of
+        # -1 means unseen. A movie's cast is only scanned again if the
+        # movie is reached at a lower cost than before, as it cannot
+        # improve anyone else
+        parent_person = array("i", [-1]) * n
+        parent_movie = array("i", [-1]) * n
+        cost = array("h", [-1]) * n
+        movie_cost = array("h", [-1]) * len(graph.movie_ids)
+        explored = bytearray(n)
+        parent_person[source] = source
+        cost[source] = 0
+
+        person_offsets = graph.person_offsets
+        movie_offsets = graph.movie_offsets
+        person_movies = memoryview(graph.person_movies)
+        movie_people = memoryview(graph.movie_people)
+        base_people, extra_movies = graph.base_people, graph.extra_movies
+        base_movies, extra_cast = graph.base_movies, graph.extra_cast
+
+        # Frontier entries are (f, -g, lazy, person); ties favour deeper
+        # nodes. People are pushed with the least f they can have, lazy
+        # set, and only rated by the heuristic once they come up: most
+        # are never popped before the target is found
+        frontier = [(heuristic(source), 0, 0, source)]
+        while frontier:
+            f, g, lazy, person = heapq.heappop(frontier)
+            if person == target:
+                return graph.trace(parent_person, parent_movie, target)
+            if explored[person] or cost[person] != -g:
+                continue
+            if lazy:
+                rated = heuristic(person) - g
+                if rated > f:
+                    heapq.heappush(frontier, (rated, g, 0, person))
+                    continue
+            explored[person] = 1
+            graph.num_explored += 1
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("search timed out")
+
+            # Since the heuristic is consistent and at least 1 away from
+            # the target, and no frontier entry is above its person's f,
+            # no path to the target is shorter than f: the target is
+            # done as soon as it is reached within f
+            g = -g
+            step = g + 1
+            # Inlined movies_of and cast_of
+            movies = ()
+            if person < base_people:
+                movies = person_movies[person_offsets[person]:person_offsets[person + 1]]
+            if person in extra_movies:
+                movies = list(movies) + extra_movies[person]
+            for movie in movies:
+                if movie_cost[movie] != -1 and movie_cost[movie] <= g:
+                    continue
+                movie_cost[movie] = g
+                cast = ()
+                if movie < base_movies:
+                    cast = movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]
+                if movie in extra_cast:
+                    cast = list(cast) + extra_cast[movie]
+                for other in cast:
+                    if explored[other] or cost[other] != -1 and cost[other] <= step:
+                        continue
+                    cost[other] = step
+                    parent_person[other] = person
+                    parent_movie[other] = movie
+                    if other == target and step <= f:
+                        return graph.trace(parent_person, parent_movie, target)
+                    if other == target:
+                        heapq.heappush(frontier, (step, -step, 0, other))
+                    else:
+                        heapq.heappush(frontier, (step + 1, -step, 1, other))
+        return None
+
+
+def choose_landmarks(graph, k):
+    """
+    Picks up to `k` landmark person indexes by farthest-point selection:
+    the best connected person first, then repeatedly whoever is farthest
+    from every landmark chosen so far. Only people in the largest
+    component and in components of at least MIN_COMPONENT people are
+    picked, preferring people no landmark reaches yet, so each of those
+    components gets landmarks too.
+
+    Returns the landmarks and their BFS distance arrays.
+    """
+    n = len(graph.person_ids)
+    if n == 0:
+        return [], []
+
+    def movie_count(person):
+        return len(graph.movies_of(person))
+
+    labels = [graph.component(person) for person in range(n)]
+    largest = max(set(labels), key=graph.component_size)
+    eligible = [
+        person for person in range(n)
+        if labels[person] == largest or graph.component_size(labels[person]) >= MIN_COMPONENT
+    ]
+
+    landmarks, trees = [], []
+    nearest = array("h", [-1]) * n
+    candidate = max(eligible, key=movie_count)
+    while len(landmarks) < k:
+        landmarks.append(candidate)
+        _, _, distance = graph.bfs_tree(candidate)
+        trees.append(distance)
+
+        # Track each person's distance to their nearest landmark
+        for person in range(n):
+            d = distance[person]
+            if d != -1 and (nearest[person] == -1 or d < nearest[person]):
+                nearest[person] = d
+
+        unreached = [p for p in eligible if nearest[p] == -1]
+        if unreached:
+            candidate = max(unreached, key=movie_count)
+        else:
+            candidate = max(eligible, key=nearest.__getitem__)
+            if nearest[candidate] == 0:
+                break
+    return landmarks, trees
+
+
+def build(graph, k=16):
+    """
+    Returns a LandmarkIndex over `graph` with up to `k` landmarks.
+    """
+    landmarks, trees = choose_landmarks(graph, k)
+    distances = array("B")
+    for distance in trees:
+        distances.extend(
+            UNREACHABLE if d == -1 else min(d, FAR) for d in distance
+        )
+    return LandmarkIndex(graph, landmarks, distances)
+
+
+def save(index, directory, stamp=None, k=16):
+    """
+    Writes the landmark table of `index`, built asking for `k`
+    landmarks, next to the dataset in `directory`.
+    """
+    if stamp is None:
+        stamp = journal_stamp(directory)
+    header = {
+        "sources": stamp,
+        "people": index.size,
+        "k": k,
+        "landmarks": list(index.landmarks),
+    }
+    path = os.path.join(directory, LANDMARKS_NAME)
+    write_file(path, MAGIC, VERSION, header, {"distances": index.distances})
+
+
+def load(graph, directory, stamp=None, k=16):
+    """
+    Maps the landmark table saved in `directory` and returns a
+    LandmarkIndex over it, or None if it is missing, stale or was built
+    asking for other than `k` landmarks.
+    """
+    if stamp is None:
+        stamp = journal_stamp(directory)
+    contents = read_file(os.path.join(directory, LANDMARKS_NAME), MAGIC, VERSION)
+    if contents is None:
+        return None
+    header, sections = contents
+    if (header["sources"] != stamp or header["people"] != len(graph.person_ids)
+            or header["k"] != k):
+        return None
+    return LandmarkIndex(graph, header["landmarks"], sections["distances"])
+
+
+def load_or_build(graph, directory, k=16):
+    """
+    Returns the saved landmark index for `directory` when current,
+    otherwise builds one with `k` landmarks and saves it.
+    """
+    stamp = journal_stamp(directory)
+    index = load(graph, directory, stamp, k)
+    if index is None:
+        index = build(graph, k)
+        try:
+            save(index, directory, stamp, k)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,235 @@
+"""
+Prefix and typo-tolerant lookup over every distinct lowercase name.
+
+Names are kept sorted, so all names starting with a prefix form one
+range found by binary search. Typos are handled with a trigram index:
+each name is split into overlapping three-letter grams and the index
+lists, for each gram, the names containing it. One edit changes at
+most three grams, so a name within k edits of the query shares all
+but 3k of its grams and must appear in at least one of the 3k + 1
+rarest posting lists of the query; only those candidates are checked
+with a bounded edit distance.
+
+The index is saved next to the dataset, like the snapshot, and mapped
+back lazily the first time a fuzzy lookup needs it. Names added by a
+delta afterwards are kept in a short sorted list checked directly.
+"""
+
+import os
+import zlib
+from array import array
+from bisect import bisect_left, insort
+
+from snapshot import StringTable, encode_strings, read_file, source_stamp, write_file
+
+MAGIC = b"DEGNAMES"
+VERSION = 1
+NAMES_NAME = "degrees.names"
+
+
+class NameIndex():
+
+    def __init__(self, keys, grams, offsets, postings):
+        """
+        Wrap sorted distinct lowercase names `keys`, the sorted gram
+        hashes `grams`, and postings[offsets[g]:offsets[g + 1]] listing
+        the key indexes containing gram g.
+        """
+        self.keys = keys
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+
+        # Sorted names added since the index was built
+        self.added = []
+
+    def add(self, name):
+        """
+        Adds a lowercase name if the index does not hold it yet.
+        """
+        i = bisect_left(self.keys, name)
+        if i < len(self.keys) and self.keys[i] == name:
+            return
+        if name not in self.added:
+            insort(self.added, name)
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns the names starting with `prefix`, in sorted order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and (limit is None or len(matches) < limit):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            matches.append(key)
+            i += 1
+        if self.added:
+            matches = sorted(matches + [key for key in self.added if key.startswith(prefix)])
+            if limit is not None:
+                matches = matches[:limit]
+        return matches
+
+    def posting(self, gram):
+        """
+        Returns the key indexes of the names containing `gram`.
+        """
+        h = gram_hash(gram)
+        i = bisect_left(self.grams, h)
+        if i == len(self.grams) or self.grams[i] != h:
+            return self.postings[0:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def fuzzy(self, name, max_edits=2):
+        """
+        Returns (distance, name) pairs for every name within `max_edits`
+        edits of `name`, closest first.
+        """
+        name = name.lower()
+        grams = trigrams(name)
+
+        # Short names tolerate fewer typos so the gram filter still applies
+        max_edits = min(max_edits, (len(grams) - 1) // 3)
+        needed = len(grams) - 3 * max_edits
+
+        lists = sorted((self.posting(gram) for gram in grams), key=len)
+        seen = set()
+        for posting in lists[:len(grams) - needed + 1]:
+            seen.update(posting)
+        candidates = [
+            self.keys[i] for i in seen
+            if len(grams & trigrams(self.keys[i])) >= needed
+        ] + self.added
+
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(name, candidate, max_edits)
+            if distance <= max_edits:
+                matches.append((distance, candidate))
+        matches.sort()
+        return matches
+
+    def search(self, name, limit=10, max_edits=2):
+        """
+        Returns up to `limit` names ranked for `name`: an exact match
+        first, then names it is a prefix of, then close misspellings.
+        """
+        name = name.lower()
+        ranked = self.prefix(name, limit=limit)
+        if len(ranked) < limit:
+            for _, match in self.fuzzy(name, max_edits=max_edits):
+                if match not in ranked:
+                    ranked.append(match)
+                    if len(ranked) == limit:
+                        break
+        return ranked
+
+
+def trigrams(text):
+    """
+    Returns the set of overlapping three-letter grams of `text`,
+    padded so the first letters form grams of their own.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def gram_hash(gram):
+    """
+    Returns a stable 32-bit hash of a gram. Collisions only add
+    candidates that the edit distance check then rejects.
+    """
+    return zlib.crc32(gram.encode("utf-8"))
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between `a` and `b`, or limit + 1
+    as soon as it is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def build(names):
+    """
+    Returns a NameIndex over an iterable of lowercase names.
+    """
+    keys = sorted(set(names))
+    postings = {}
+    for i, key in enumerate(keys):
+        for gram in trigrams(key):
+            postings.setdefault(gram_hash(gram), array("i")).append(i)
+
+    grams = array("I", sorted(postings))
+    offsets = array("q", [0])
+    flat = array("i")
+    for h in grams:
+        flat.extend(postings[h])
+        offsets.append(len(flat))
+    return NameIndex(keys, grams, offsets, flat)
+
+
+def save(index, directory, stamp=None):
+    """
+    Writes `index` next to the dataset in `directory`.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+    blob, key_offsets = encode_strings(index.keys)
+    sections = {
+        "keys.blob": blob,
+        "keys.offsets": key_offsets,
+        "grams": index.grams,
+        "offsets": index.offsets,
+        "postings": index.postings,
+    }
+    write_file(os.path.join(directory, NAMES_NAME), MAGIC, VERSION, {"sources": stamp}, sections)
+
+
+def load(directory, stamp=None):
+    """
+    Maps the name index saved in `directory`, or returns None if it is
+    missing or stale.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+    contents = read_file(os.path.join(directory, NAMES_NAME), MAGIC, VERSION)
+    if contents is None or contents[0]["sources"] != stamp:
+        return None
+    _, sections = contents
+    return NameIndex(
+        StringTable(sections["keys.blob"], sections["keys.offsets"]),
+        sections["grams"], sections["offsets"], sections["postings"]
+    )
+
+
+def load_or_build(names, directory):
+    """
+    Returns the saved name index for `directory` when current, otherwise
+    builds one over the lowercase `names` and saves it.
+    """
+    stamp = source_stamp(directory)
+    index = load(directory, stamp)
+    if index is None:
+        index = build(names)
+        try:
+            save(index, directory, stamp)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,196 @@
+"""
+Level-synchronous parallel breadth-first search over a CompactGraph.
+
+The CSR arrays are copied once into multiprocessing.shared_memory
+blocks that every worker process attaches to, along with two shared
+byte maps marking the people and movies already reached. Each BFS
+level is split into chunks, one per worker, and workers send back
+(person, parent, movie) candidate triples for the next level, which
+the main process merges, deduplicates and marks before the next level
+starts. Levels smaller than a threshold are expanded in the main
+process, so short queries never pay for process round trips. Star rows
+added to the graph after the workers start are not seen by them, so
+the search is restarted after a delta is applied.
+"""
+
+import multiprocessing
+import threading
+import time
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+
+# Shared arrays of a worker process, set up by attach
+shared = {}
+
+
+class ParallelSearch():
+
+    def __init__(self, graph, workers=None, threshold=4096):
+        """
+        Share `graph` with a pool of `workers` processes (one per core by
+        default). Levels with fewer than `threshold` people are expanded
+        serially.
+        """
+        self.graph = graph
+        self.threshold = threshold
+        self.workers = workers or multiprocessing.cpu_count()
+        self.num_explored = 0
+
+        person_offsets, person_movies, movie_offsets, movie_people = graph.csr_arrays()
+        arrays = {
+            "person_offsets": (person_offsets, "i"),
+            "person_movies": (person_movies, "i"),
+            "movie_offsets": (movie_offsets, "i"),
+            "movie_people": (movie_people, "i"),
+            "seen_people": (bytes(len(graph.person_ids)), "B"),
+            "seen_movies": (bytes(len(graph.movie_ids)), "B"),
+        }
+        self.blocks = {}
+        self.views = {}
+        spec = {}
+        for name, (data, typecode) in arrays.items():
+            data = memoryview(data).cast("B")
+            block = SharedMemory(create=True, size=max(data.nbytes, 1))
+            block.buf[:data.nbytes] = data
+            self.blocks[name] = block
+            self.views[name] = block.buf[:data.nbytes].cast(typecode)
+            spec[name] = (block.name, data.nbytes, typecode)
+
+        self.pool = multiprocessing.Pool(self.workers, initializer=attach, initargs=(spec,))
+
+        # One search at a time owns the shared seen maps
+        self.lock = threading.Lock()
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        self.pool.terminate()
+        self.pool.join()
+        for view in self.views.values():
+            view.release()
+        self.views.clear()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def shortest_path(self, source, target, deadline=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect person_id `source` to person_id `target`, or None.
+
+        Raises TimeoutError once time.monotonic() passes `deadline`.
+        """
+        graph = self.graph
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+        self.num_explored = 0
+        if source == target:
+            return []
+
+        with self.lock:
+            seen_people = self.views["seen_people"]
+            seen_movies = self.views["seen_movies"]
+            seen_people[:] = bytes(len(seen_people))
+            seen_movies[:] = bytes(len(seen_movies))
+
+            parent_person = array("i", [-1]) * len(graph.person_ids)
+            parent_movie = array("i", [-1]) * len(graph.person_ids)
+            parent_person[source] = source
+            seen_people[source] = 1
+
+            frontier = array("i", [source])
+            while frontier:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("search timed out")
+                self.num_explored += len(frontier)
+
+                if len(frontier) < self.threshold:
+                    found, movies = expand_level(self.views, frontier)
+                else:
+                    found, movies = self.expand_parallel(frontier)
+
+                for movie in movies:
+                    seen_movies[movie] = 1
+                frontier = array("i")
+                for i in range(0, len(found), 3):
+                    other = found[i]
+                    if seen_people[other]:
+                        continue
+                    seen_people[other] = 1
+                    parent_person[other] = found[i + 1]
+                    parent_movie[other] = found[i + 2]
+                    frontier.append(other)
+
+                if parent_person[target] != -1:
+                    return graph.trace(parent_person, parent_movie, target)
+        return None
+
+    def expand_parallel(self, frontier):
+        """
+        Splits `frontier` across the worker pool and concatenates the
+        candidate triples and scanned movies they send back.
+        """
+        size = -(-len(frontier) // self.workers)
+        chunks = [
+            frontier[i:i + size].tobytes()
+            for i in range(0, len(frontier), size)
+        ]
+        found, movies = array("i"), array("i")
+        for found_bytes, movie_bytes in self.pool.map(expand_chunk, chunks):
+            found.frombytes(found_bytes)
+            movies.frombytes(movie_bytes)
+        return found, movies
+
+
+def attach(spec):
+    """
+    Pool initializer: maps every shared block into this worker.
+    """
+    for name, (block_name, size, typecode) in spec.items():
+        block = SharedMemory(name=block_name)
+        shared[name] = (block, block.buf[:size].cast(typecode))
+
+
+def expand_chunk(chunk):
+    """
+    Worker task: expands the people packed in `chunk` against the
+    shared arrays and returns packed candidate triples and movies.
+    """
+    frontier = array("i")
+    frontier.frombytes(chunk)
+    views = {name: view for name, (_, view) in shared.items()}
+    found, movies = expand_level(views, frontier)
+    return found.tobytes(), movies.tobytes()
+
+
+def expand_level(views, frontier):
+    """
+    Expands every person in `frontier` one step, skipping people and
+    movies marked in the shared seen maps, which are only read here.
+
+    Returns (other, parent, movie) triples flattened into one array,
+    and the movies whose casts were scanned.
+    """
+    person_offsets = views["person_offsets"]
+    person_movies = views["person_movies"]
+    movie_offsets = views["movie_offsets"]
+    movie_people = views["movie_people"]
+    seen_people = views["seen_people"]
+    seen_movies = views["seen_movies"]
+
+    found, movies = array("i"), array("i")
+    found_people, found_movies = set(), set()
+    for person in frontier:
+        for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+            if seen_movies[movie] or movie in found_movies:
+                continue
+            found_movies.add(movie)
+            movies.append(movie)
+            for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                if seen_people[other] or other in found_people:
+                    continue
+                found_people.add(other)
+                found.extend((other, person, movie))
+    return found, movies
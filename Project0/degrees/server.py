@@ -0,0 +1,234 @@
+"""
+Long-running query server for degrees.
+
+Loads the data once, then answers line-delimited JSON requests read
+from stdin (the default) or from clients of a local TCP socket. Each
+request is one line such as
+
+    {"id": 1, "pairs": [["Kevin Bacon", "Tom Hanks"], ["102", "129"]],
+     "engine": "bidirectional", "timeout": 5, "policy": "unique"}
+
+where sources and targets are person ids or names, and "engine",
+"timeout" (seconds) and "policy" (how names are resolved, see
+degrees.person_id_for_name; "ask" is not allowed) are optional. One response line is streamed back
+per pair as soon as its search finishes, so in completion order:
+
+    {"id": 1, "index": 0, "source": "102", "target": "158",
+     "degrees": 1, "path": [["112384", "158"]]}
+
+"degrees" and "path" are null when the people are not connected, and
+an "error" is given instead when a name can't be resolved, the search
+runs past its timeout or fails. A final {"id": 1, "done": true} line
+closes each request. A request that can't be parsed or is invalid gets
+a single {"id": 1, "error": ...} line instead, with the id null if the
+line isn't a JSON object. Searches run concurrently on a thread pool and
+give up cooperatively once their deadline passes.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import degrees
+
+
+def resolve(value, policy="unique"):
+    """
+    Returns (person_id, error) for a person id or name without ever
+    prompting, with an error listing the best candidates if the name
+    can't be resolved under `policy`.
+    """
+    if value in degrees.people:
+        return value, None
+    person_id = degrees.person_id_for_name(value, policy=policy)
+    if person_id is not None:
+        return person_id, None
+    candidates = degrees.rank_people(value, limit=5)
+    if not candidates:
+        return None, f"person not found: {value}"
+    return None, f"ambiguous name: {value} (candidates: {', '.join(candidates)})"
+
+
+class QueryServer():
+
+    def __init__(self, engine="bidirectional", timeout=None, workers=4):
+        """
+        Create a server answering with `engine`, giving each search at
+        most `timeout` seconds unless a request asks otherwise.
+        """
+        self.engine = engine
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def resolve_pair(self, source, target, policy):
+        """
+        Resolves both people of a pair on a worker thread, see resolve.
+        """
+        return resolve(str(source), policy), resolve(str(target), policy)
+
+    def search(self, source, target, engine, timeout):
+        """
+        Runs one shortest_path search on a worker thread.
+        """
+        degrees.limits.deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            return degrees.shortest_path(source, target, engine=engine)
+        finally:
+            degrees.limits.deadline = None
+
+    async def answer(self, request_id, index, pair, engine, timeout, policy):
+        """
+        Returns the response for one (source, target) pair of a request.
+        """
+        response = {"id": request_id, "index": index}
+        try:
+            source, target = pair
+        except (TypeError, ValueError):
+            response["error"] = "pairs must be [source, target] lists"
+            return response
+
+        # Names are resolved off the event loop too, as the first fuzzy
+        # lookup builds the name index
+        loop = asyncio.get_running_loop()
+        try:
+            (source, source_error), (target, target_error) = await loop.run_in_executor(
+                self.executor, self.resolve_pair, source, target, policy
+            )
+        except Exception as e:
+            response["error"] = f"name lookup failed: {e}"
+            return response
+        response["source"] = source
+        response["target"] = target
+        if source_error or target_error:
+            response["error"] = source_error or target_error
+            return response
+
+        try:
+            path = await loop.run_in_executor(
+                self.executor, self.search, source, target, engine, timeout
+            )
+        except TimeoutError:
+            response["error"] = "timed out"
+            return response
+        except Exception as e:
+            # One failed search must not take down the other requests
+            response["error"] = f"search failed: {e}"
+            return response
+        response["degrees"] = None if path is None else len(path)
+        response["path"] = path
+        return response
+
+    async def handle(self, line, write):
+        """
+        Answers one request line, writing each response with `write`.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            pairs = request["pairs"]
+            engine = request.get("engine", self.engine)
+            timeout = request.get("timeout", self.timeout)
+            policy = request.get("policy", "unique")
+            if engine not in degrees.ENGINES:
+                raise ValueError(f"unknown engine: {engine}")
+            if engine in degrees.COMPACT_ENGINES and degrees.graph is None:
+                raise ValueError(f"{engine} engine needs a server started with --compact")
+            if timeout is not None and (isinstance(timeout, bool)
+                                        or not isinstance(timeout, (int, float))):
+                raise ValueError(f"timeout must be a number of seconds: {timeout!r}")
+            if policy not in degrees.POLICIES or policy == "ask":
+                raise ValueError(f"unknown policy: {policy}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            write({"id": request_id, "error": f"invalid request: {e}"})
+            return
+
+        tasks = [
+            asyncio.ensure_future(self.answer(request_id, index, pair, engine, timeout, policy))
+            for index, pair in enumerate(pairs)
+        ]
+        for task in asyncio.as_completed(tasks):
+            write(await task)
+        write({"id": request_id, "done": True})
+
+    async def serve_lines(self, reader, write):
+        """
+        Handles every request line from `reader` concurrently until
+        it is exhausted.
+        """
+        pending = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.create_task(self.handle(line, write))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+
+    async def serve_stdio(self):
+        """
+        Serves requests from stdin, answering on stdout.
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 24)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        def write(response):
+            sys.stdout.write(json.dumps(response) + "\n")
+            sys.stdout.flush()
+
+        await self.serve_lines(reader, write)
+
+    async def serve_tcp(self, host, port):
+        """
+        Serves requests from any number of clients on host:port.
+        """
+        async def client(reader, writer):
+            def write(response):
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            try:
+                await self.serve_lines(reader, write)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(client, host, port, limit=2 ** 24)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve degrees queries as JSON lines.")
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--engine", choices=degrees.ENGINES, default="bidirectional",
+                        help="default search strategy")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the graph in integer-indexed CSR arrays")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="default per-search timeout in seconds")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="number of searches run at once")
+    parser.add_argument("--port", type=int, default=None,
+                        help="listen on this local TCP port instead of stdin")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact or args.engine in degrees.COMPACT_ENGINES)
+    print("Data loaded.", file=sys.stderr)
+
+    server = QueryServer(engine=args.engine, timeout=args.timeout, workers=args.workers)
+    if args.port is None:
+        asyncio.run(server.serve_stdio())
+    else:
+        asyncio.run(server.serve_tcp(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
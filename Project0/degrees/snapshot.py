@@ -0,0 +1,286 @@
+"""
+Versioned binary snapshot of a CompactGraph.
+
+A snapshot file starts with a fixed header
+
+    MAGIC (8 bytes) | version (uint32) | header length (uint32)
+
+followed by a JSON header describing the CSV files it was built from
+and where each section lives, and then the sections themselves, each
+aligned to 8 bytes. Sections are raw `array` buffers, so loading is a
+single mmap and every array is a zero-copy memoryview into it. Strings
+are stored as one UTF-8 blob per column plus an offsets array and are
+only decoded when looked up.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Mapping, Sequence
+
+from compact import CompactGraph, load_compact
+
+MAGIC = b"DEGREES\0"
+VERSION = 2
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+PREFIX = struct.Struct("<8sII")
+
+
+class StringTable(Sequence):
+    """
+    Sequence of strings backed by a UTF-8 blob and an offsets array,
+    where string i is blob[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class SortedIndex(Mapping):
+    """
+    Dict-like lookup of strings in a table through a permutation `order`
+    that sorts the table, answered by binary search instead of hashing.
+
+    With `unique`, a key maps to a single table index, otherwise to a
+    list of every index holding that key. With `fold`, keys are compared
+    in lowercase.
+    """
+
+    def __init__(self, table, order, unique=True, fold=False):
+        self.table = table
+        self.order = order
+        self.unique = unique
+        self.fold = fold
+        self.size = None
+
+    def key(self, i):
+        """
+        Returns the sort key of table index `i`.
+        """
+        value = self.table[i]
+        return value.lower() if self.fold else value
+
+    def span(self, key):
+        """
+        Returns the half-open range of `order` positions holding `key`.
+        """
+        # Binary search for the first position not below key, by hand
+        # as bisect only takes a key function from Python 3.10
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(self.order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        hi = lo
+        while hi < len(self.order) and self.key(self.order[hi]) == key:
+            hi += 1
+        return lo, hi
+
+    def __getitem__(self, key):
+        lo, hi = self.span(key)
+        if lo == hi:
+            raise KeyError(key)
+        if self.unique:
+            return self.order[lo]
+        return list(self.order[lo:hi])
+
+    def __iter__(self):
+        previous = None
+        for i in self.order:
+            key = self.key(i)
+            if key != previous:
+                yield key
+                previous = key
+
+    def __len__(self):
+        if self.unique:
+            return len(self.order)
+        if self.size is None:
+            self.size = sum(1 for _ in self)
+        return self.size
+
+
+def source_stamp(directory):
+    """
+    Returns the size and modification time of each source CSV file,
+    which a snapshot must match to be reused.
+    """
+    stamp = {}
+    for name in SOURCES:
+        info = os.stat(os.path.join(directory, name))
+        stamp[name] = [info.st_size, info.st_mtime_ns]
+    return stamp
+
+
+def encode_strings(strings):
+    """
+    Returns the (blob, offsets) pair a StringTable is read from.
+    """
+    blob = bytearray()
+    offsets = array("q", [0])
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def sort_order(strings, fold=False):
+    """
+    Returns the permutation of indexes that sorts `strings`.
+    """
+    if fold:
+        return array("i", sorted(range(len(strings)), key=lambda i: strings[i].lower()))
+    return array("i", sorted(range(len(strings)), key=strings.__getitem__))
+
+
+def write_file(path, magic, version, header, sections):
+    """
+    Writes a file of named array `sections` after a fixed prefix and a
+    JSON `header`, to which the section layout is added. The file is
+    written under a temporary name first so readers never see a
+    partial file.
+    """
+    # Lay sections out after the header, each on an 8-byte boundary
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        view = memoryview(data)
+        layout[name] = [position, view.nbytes, view.format]
+        position += (view.nbytes + 7) // 8 * 8
+    header = json.dumps(dict(header, sections=layout)).encode("utf-8")
+    start = (PREFIX.size + len(header) + 7) // 8 * 8
+
+    # Unique to this process and thread, so concurrent writers of one
+    # path never write into the same temporary file
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREFIX.pack(magic, version, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.seek(start + layout[name][0])
+            f.write(memoryview(data).cast("B"))
+        f.truncate(start + position)
+    os.replace(temporary, path)
+
+
+def read_file(path, magic, version):
+    """
+    Maps a file written by write_file and returns its (header, sections),
+    each section a zero-copy memoryview of its original type, or None if
+    the file is missing or has another magic or version.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(data) < PREFIX.size:
+        return None
+    file_magic, file_version, length = PREFIX.unpack_from(data)
+    if file_magic != magic or file_version != version:
+        return None
+    header = json.loads(data[PREFIX.size:PREFIX.size + length])
+    start = (PREFIX.size + length + 7) // 8 * 8
+
+    view = memoryview(data)
+    sections = {}
+    for name, (offset, size, typecode) in header["sections"].items():
+        section = view[start + offset:start + offset + size]
+        sections[name] = section if typecode == "B" else section.cast(typecode)
+    return header, sections
+
+
+def save(graph, directory, stamp=None):
+    """
+    Writes a snapshot of `graph` built from the CSVs in `directory`.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+
+    sections = {
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_people": graph.movie_people,
+        "person_order": sort_order(graph.person_ids),
+        "movie_order": sort_order(graph.movie_ids),
+        "name_order": sort_order(graph.person_names, fold=True),
+        "components": graph.components,
+        "component_sizes": graph.component_sizes,
+    }
+    for column in ("person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years"):
+        blob, offsets = encode_strings(getattr(graph, column))
+        sections[f"{column}.blob"] = blob
+        sections[f"{column}.offsets"] = offsets
+
+    path = os.path.join(directory, SNAPSHOT_NAME)
+    write_file(path, MAGIC, VERSION, {"sources": stamp}, sections)
+
+
+def load(directory, stamp=None):
+    """
+    Maps the snapshot in `directory` and returns a CompactGraph over it,
+    or None if there is no snapshot, it has another version, or it
+    was built from different CSV files.
+    """
+    if stamp is None:
+        stamp = source_stamp(directory)
+    contents = read_file(os.path.join(directory, SNAPSHOT_NAME), MAGIC, VERSION)
+    if contents is None or contents[0]["sources"] != stamp:
+        return None
+    _, sections = contents
+
+    def strings(column):
+        return StringTable(sections[f"{column}.blob"], sections[f"{column}.offsets"])
+
+    person_ids = strings("person_ids")
+    person_names = strings("person_names")
+    movie_ids = strings("movie_ids")
+    return CompactGraph(
+        person_ids, person_names, strings("person_births"),
+        movie_ids, strings("movie_titles"), strings("movie_years"),
+        sections["person_offsets"], sections["person_movies"],
+        sections["movie_offsets"], sections["movie_people"],
+        person_index=SortedIndex(person_ids, sections["person_order"]),
+        movie_index=SortedIndex(movie_ids, sections["movie_order"]),
+        name_index=SortedIndex(person_names, sections["name_order"], unique=False, fold=True),
+        components=sections["components"],
+        component_sizes=sections["component_sizes"]
+    )
+
+
+def load_or_build(directory):
+    """
+    Returns a CompactGraph for `directory`, from its snapshot when that
+    is current, otherwise parsed from the CSVs and snapshotted for the
+    next run.
+    """
+    stamp = source_stamp(directory)
+    graph = load(directory, stamp)
+    if graph is None:
+        graph = load_compact(directory)
+        try:
+            save(graph, directory, stamp)
+        except OSError:
+            pass
+    return graph
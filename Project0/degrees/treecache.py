@@ -0,0 +1,166 @@
+"""
+LRU cache of complete breadth-first search trees over a CompactGraph.
+
+Batch workloads tend to fix one person and vary the other. Once the
+full BFS tree of a person is known, any query from that person, or to
+them since co-starring is symmetric, is answered by walking parent
+pointers instead of searching again.
+
+When star rows are added to the graph, only the trees whose distances
+the new rows could change are dropped; see invalidate.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class TreeCache():
+
+    def __init__(self, graph, budget=256 * 2 ** 20):
+        """
+        Create an empty cache holding at most `budget` bytes of trees.
+        """
+        self.graph = graph
+        self.budget = budget
+        self.trees = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Guards `trees` and `size` when searches run on several threads
+        self.lock = threading.Lock()
+
+    def get(self, source):
+        """
+        Returns the cached tree of person index `source`, or None,
+        marking it as most recently used.
+        """
+        with self.lock:
+            tree = self.trees.get(source)
+            if tree is not None:
+                self.trees.move_to_end(source)
+            return tree
+
+    def put(self, source, tree):
+        """
+        Caches `tree` for person index `source`, evicting the least
+        recently used trees until it fits. Trees larger than the whole
+        budget are not cached.
+        """
+        size = tree_size(tree)
+        if size > self.budget:
+            return
+        with self.lock:
+            if source in self.trees:
+                self.size -= tree_size(self.trees.pop(source))
+            while self.size + size > self.budget:
+                _, evicted = self.trees.popitem(last=False)
+                self.size -= tree_size(evicted)
+            self.trees[source] = tree
+            self.size += size
+
+    def tree(self, source, deadline=None):
+        """
+        Returns the tree of person index `source`, running and caching
+        a complete BFS on a miss.
+        """
+        tree = self.get(source)
+        if tree is not None:
+            self.hits += 1
+            return tree
+        self.misses += 1
+        tree = self.graph.bfs_tree(source, deadline=deadline)
+        self.put(source, tree)
+        return tree
+
+    def clear(self):
+        """
+        Drops every cached tree.
+        """
+        with self.lock:
+            self.trees.clear()
+            self.size = 0
+
+    def invalidate(self, stars):
+        """
+        Drops the cached trees that new (person, movie) star rows make
+        stale. A row links the person to the whole cast of the movie, and
+        a BFS tree stays exact as long as every new link joins two people
+        it cannot reach, or two reached people whose distances differ by
+        at most one: such links never shorten a path. People added after
+        a tree was built count as unreachable from it.
+        """
+        graph = self.graph
+        with self.lock:
+            for source, tree in list(self.trees.items()):
+                distance = tree[2]
+                for person, movie in stars:
+                    d = reach(distance, person)
+                    if any(not linked(d, reach(distance, other))
+                           for other in graph.cast_of(movie)):
+                        del self.trees[source]
+                        self.size -= tree_size(tree)
+                        break
+
+    def shortest_path(self, source, target, deadline=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs from
+        person_id `source` to person_id `target`, or None, using a cached
+        tree rooted at either end, or building the source's tree.
+        """
+        graph = self.graph
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+        graph.num_explored = 0
+
+        # A tree rooted at the target is walked upwards from the source
+        tree = None if source in self.trees else self.get(target)
+        if tree is not None:
+            self.hits += 1
+            parent_person, parent_movie, distance = tree
+            if reach(distance, source) == -1:
+                return None
+            return graph.climb(parent_person, parent_movie, source)
+
+        parent_person, parent_movie, distance = self.tree(source, deadline=deadline)
+        if reach(distance, target) == -1:
+            return None
+        return graph.trace(parent_person, parent_movie, target)
+
+    def distances_from(self, source, deadline=None):
+        """
+        Returns a dict mapping every person_id reachable from person_id
+        `source` to their degrees of separation from the source.
+        """
+        graph = self.graph
+        _, _, distance = self.tree(graph.person_index[source], deadline=deadline)
+        person_ids = graph.person_ids
+        return {
+            person_ids[person]: degree
+            for person, degree in enumerate(distance) if degree != -1
+        }
+
+
+def reach(distance, person):
+    """
+    Returns the distance of a person index in a tree's distance array,
+    or -1 if it is unreachable or was added after the tree was built.
+    """
+    return distance[person] if person < len(distance) else -1
+
+
+def linked(a, b):
+    """
+    Returns whether linking people at tree distances `a` and `b` keeps
+    the tree exact.
+    """
+    if a == -1 or b == -1:
+        return a == b
+    return abs(a - b) <= 1
+
+
+def tree_size(tree):
+    """
+    Returns the number of bytes held by a tree's arrays.
+    """
+    return sum(len(column) * column.itemsize for column in tree)
@@ -0,0 +1,61 @@
+from collections import deque
+
+
+class Node():
+    def __init__(self, state, parent, action):
+        self.state = state
+        self.parent = parent
+        self.action = action
+
+
+class StackFrontier():
+    def __init__(self):
+        """Creates empty frontier in form of a deque, plus a count of
+            the nodes held for each state"""
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        """Appends frontier by adding node to end of deque"""
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        """checks if frontier contains particular state, in constant time"""
+        return state in self.states
+
+    def empty(self):
+        """Checks if frontier is empty"""
+        return len(self.frontier) == 0
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def remove(self):
+        """Removes last item from deque (Stack Frontier,
+            last in, first out)"""
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.discard(node.state)
+        return node
+
+    def discard(self, state):
+        """Forgets one node of a state that has left the frontier"""
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
+
+
+class QueueFrontier(StackFrontier):
+
+    def remove(self):
+        """Removes first item from deque (Queue frontier,
+            first in, first out)"""
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.discard(node.state)
+        return node
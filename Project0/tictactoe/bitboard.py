@@ -0,0 +1,195 @@
+"""
+Bitboard engine for Tic Tac Toe.
+
+The board functions in tictactoe.py copy a list of lists for every move
+and rescan all nine squares to find the player or the winner. Here a
+position is two 9-bit integers, one for the squares of each player,
+where square (i, j) is bit 3 * i + j. Moves are a bitwise or, and a
+player has won when one of the eight LINES masks is all theirs.
+
+to_bits and to_board convert from and to the list-of-lists boards that
+runner.py uses, and minimax takes and returns the same board and action
+as tictactoe.minimax. Positions are stored under a key that is the
+same for all their rotations and reflections, see key.
+"""
+
+import tictactoe as ttt
+
+# All nine squares taken
+FULL = (1 << 9) - 1
+
+# Rows, columns and diagonals
+LINES = (0b000000111, 0b000111000, 0b111000000,
+         0b001001001, 0b010010010, 0b100100100,
+         0b100010001, 0b001010100)
+
+# Bits in row-major order, and in search order: center, corners, edges
+SQUARES = tuple(1 << n for n in range(9))
+ORDER = tuple(1 << n for n in (4, 0, 2, 6, 8, 1, 3, 5, 7))
+
+# For each of ttt.SYMMETRIES, the symmetric mask of each of the 512 masks
+SYMMETRIC = tuple(
+    tuple(sum(1 << n for n, square in enumerate(symmetry) if mask >> square & 1)
+          for mask in range(1 << 9))
+    for symmetry in ttt.SYMMETRIES
+)
+
+# Exact value of positions searched so far, for the player to move,
+# keyed by key(mover, other)
+values = {}
+
+# Positions visited by the last call to minimax
+nodes = 0
+
+
+def to_bits(board):
+    """
+    Returns (x, o), the bitmasks of the squares X and O hold on a
+    list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == ttt.X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == ttt.O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for bitmasks x and o.
+    """
+    return [[ttt.X if x >> (3 * i + j) & 1 else ttt.O if o >> (3 * i + j) & 1 else ttt.EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def to_action(bit):
+    """
+    Returns the (i, j) action for the square of a single bit.
+    """
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def player(x, o):
+    """
+    Returns the player who moves next.
+    """
+    return ttt.X if bin(x).count("1") == bin(o).count("1") else ttt.O
+
+
+def won(mask):
+    """
+    Returns True if the squares in mask complete a line.
+    """
+    for line in LINES:
+        if mask & line == line:
+            return True
+    return False
+
+
+def winner(x, o):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    if won(x):
+        return ttt.X
+    if won(o):
+        return ttt.O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return x | o == FULL or won(x) or won(o)
+
+
+def key(mover, other):
+    """
+    Returns the values key of a position, from the squares of the player
+    to move and of the other player: the least key of its symmetries, so
+    the eight symmetric versions of a position share one entry.
+    """
+    return min(table[mover] | table[other] << 9 for table in SYMMETRIC)
+
+
+def clear_table():
+    """
+    Empties the table of position values.
+    """
+    values.clear()
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on a list-of-lists
+    board: the first optimal one in the order of ttt.actions, like
+    tictactoe.minimax. Sets nodes to the number of positions visited.
+    """
+    global nodes
+    nodes = 0
+
+    x, o = to_bits(board)
+    if terminal(x, o):
+        return None
+    mover, other = (x, o) if player(x, o) == ttt.X else (o, x)
+
+    # Only whether an action beats the best so far matters, and
+    # nothing beats a win. Symmetric actions lead to the same position,
+    # so only the first of them is searched
+    best = -2
+    best_action = None
+    searched = {}
+    for bit in SQUARES:
+        if (mover | other) & bit:
+            continue
+        child = key(other, mover | bit)
+        if child not in searched:
+            searched[child] = -negamax(other, mover | bit, -2, -best)
+        value = searched[child]
+        if value > best:
+            best = value
+            best_action = to_action(bit)
+        if best == 1:
+            break
+    return best_action
+
+
+def negamax(mover, other, alpha, beta):
+    """
+    Returns the value of a position for the player to move, 1 for a win,
+    -1 for a loss and 0 for a tie, if it lies between alpha and beta;
+    otherwise returns a value no better than the bound crossed.
+    """
+    global nodes
+    nodes += 1
+
+    position = key(mover, other)
+    if position in values:
+        return values[position]
+
+    # Only the player who just moved can have won
+    if won(other):
+        v = -1
+    elif mover | other == FULL:
+        v = 0
+    else:
+        v = -2
+        taken = mover | other
+        for bit in ORDER:
+            if taken & bit:
+                continue
+            v = max(v, -negamax(other, mover | bit, -beta, -max(alpha, v)))
+            if v >= beta or v == 1:
+                break
+
+        # Only values strictly inside the window are exact
+        if not (alpha < v < beta or v == 1):
+            return v
+
+    values[position] = v
+    return v
@@ -0,0 +1,79 @@
+"""
+Builds the Tic Tac Toe opening book.
+
+Usage: python book.py [PATH]
+
+Tic Tac Toe is small enough to solve completely: this visits each of
+the 5478 boards reachable from the empty one, solves it with the
+bitboard engine, and writes its best move and value to a table of one
+byte per board (see tictactoe.BOOK_PATH for the format). tictactoe.py
+memory-maps the table when it is imported, so minimax is a single
+lookup for every move.
+"""
+
+import os
+import sys
+
+import bitboard
+import tictactoe as ttt
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [PATH]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_PATH
+
+    table = build()
+    write(path, table)
+    print(f"Wrote {sum(1 for entry in table if entry)} boards to {path}.")
+
+
+def build():
+    """
+    Returns the book's table of entries, one byte for each board.
+    """
+    table = bytearray(3 ** 9)
+    frontier = [(0, 0)]
+    while frontier:
+        x, o = frontier.pop()
+        board = bitboard.to_board(x, o)
+        index = ttt.book_index(board)
+        if table[index]:
+            continue
+
+        if bitboard.terminal(x, o):
+            value = 1 if bitboard.won(x) else -1 if bitboard.won(o) else 0
+            table[index] = 0x80 | (value + 1) << 4
+            continue
+
+        # The value comes from the same table the move search fills
+        i, j = bitboard.minimax(board)
+        x_moves = bitboard.player(x, o) == ttt.X
+        mover, other = (x, o) if x_moves else (o, x)
+        value = bitboard.negamax(mover, other, -2, 2)
+        if not x_moves:
+            value = -value
+        table[index] = 0x80 | (value + 1) << 4 | (3 * i + j + 1)
+
+        # Add the boards each move leads to
+        taken = x | o
+        for bit in bitboard.SQUARES:
+            if not taken & bit:
+                frontier.append((x | bit, o) if x_moves else (x, o | bit))
+    return table
+
+
+def write(path, table):
+    """
+    Writes the book to path, through a temporary file so that a reader
+    never maps a partial book.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(ttt.BOOK_MAGIC)
+        f.write(table)
+    os.replace(temporary, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,9 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# Keep the AI's transposition table between games
+keep_table = "--fresh" not in sys.argv[1:]
+
 user = None
 board = ttt.initial_state()
 ai_turn = False
@@ -142,5 +145,7 @@ while True:
                     user = None
                     board = ttt.initial_state()
                     ai_turn = False
+                    if not keep_table:
+                        ttt.clear_table()
 
     pygame.display.flip()
@@ -4,11 +4,81 @@ Tic Tac Toe Player
 
 import copy
 import math
+import mmap
+import os
 
 X = "X"
 O = "O"
 EMPTY = None
 
+#The eight symmetries of the board, its rotations and reflections. Each
+#lists, for the squares of the symmetric board in row-major order, the
+#square 3 * i + j of the board it takes its cell from
+SYMMETRIES = ((0, 1, 2, 3, 4, 5, 6, 7, 8),
+              (6, 3, 0, 7, 4, 1, 8, 5, 2),
+              (8, 7, 6, 5, 4, 3, 2, 1, 0),
+              (2, 5, 8, 1, 4, 7, 0, 3, 6),
+              (2, 1, 0, 5, 4, 3, 8, 7, 6),
+              (6, 7, 8, 3, 4, 5, 0, 1, 2),
+              (0, 3, 6, 1, 4, 7, 2, 5, 8),
+              (8, 5, 2, 7, 4, 1, 6, 3, 0))
+
+#Transposition table: exact game value of every position searched so far,
+#keyed by board_key, so symmetric positions share an entry. It lives as
+#long as the module, so later moves (and later games, unless clear_table
+#is called) are mostly lookups
+transpositions = {}
+
+#Search engines minimax accepts
+ENGINES = ("book", "bitboard", "alphabeta", "memoized", "exhaustive")
+
+#Opening book written by book.py: BOOK_MAGIC, then one byte for each
+#board, at the index that reads its cells as base 3 digits (EMPTY 0, X 1,
+#O 2) with square 3 * i + j weighted 3 ** (3 * i + j). A byte is 0 for
+#unreachable boards; otherwise bit 7 is set, bits 4-5 hold the value of
+#the board plus one, as for utility, and bits 0-3 hold the square of the
+#best move plus one, or 0 if the game is over
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+BOOK_MAGIC = b"TTT1"
+BOOK_SIZE = len(BOOK_MAGIC) + 3 ** 9
+
+#Static move order for alpha-beta: center, then corners, then edges
+MOVE_ORDER = {(1, 1): 0,
+              (0, 0): 1, (0, 2): 1, (2, 0): 1, (2, 2): 1,
+              (0, 1): 2, (1, 0): 2, (1, 2): 2, (2, 1): 2}
+
+#Alpha-beta ordering hints: the last move to cause a cutoff with a given
+#number of empty squares left (killer moves), and a score for how often
+#and how high up each move has caused one (history)
+killers = {}
+history = {}
+
+#Positions visited by the last call to minimax. The engines that keep a
+#transposition table mostly look up what earlier calls searched, so
+#their counts are only comparable when each starts from an empty table
+#(see clear_table); "exhaustive" keeps none, so its count never changes
+nodes = 0
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Returns the opening book at path, memory-mapped, or None if it is
+    missing or not a book.
+    """
+    try:
+        with open(path, "rb") as f:
+            table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(table) != BOOK_SIZE or table[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+        table.close()
+        return None
+    return table
+
+
+#The opening book, mapped once at import
+book = load_book()
+
 
 def initial_state():
     """
@@ -153,12 +223,92 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def board_key(board):
+    """
+    Returns a hashable encoding of the board that is the same for all its
+    rotations and reflections: the least of the strings of its nine cells
+    in the row-major order of each of its SYMMETRIES.
+    """
+    cells = ["-" if cell == EMPTY else cell for row in board for cell in row]
+    return min("".join([cells[square] for square in symmetry]) for symmetry in SYMMETRIES)
+
+
+def clear_table():
+    """
+    Empties the transposition table, and the bitboard engine's.
+    """
+    #Imported here, as bitboard imports this module
+    import bitboard
+
+    transpositions.clear()
+    bitboard.clear_table()
+
+
+def book_index(board):
+    """
+    Returns the index of the board's entry in the opening book.
+    """
+    index = 0
+    weight = 1
+    for row in board:
+        for cell in row:
+            if cell == X:
+                index += weight
+            elif cell == O:
+                index += 2 * weight
+            weight *= 3
+    return index
+
+
+def book_entry(board):
     """
-    Returns the optimal action for the current player on the board.
+    Returns (action, value) for the board from the opening book, where
+    action is the best move (None if the game is over) and value is as
+    for utility; None if there is no book or the board is not in it.
     """
-    #Check board for empty square
-    empty_square = 0
+    if book is None:
+        return None
+    entry = book[len(BOOK_MAGIC) + book_index(board)]
+    if not entry & 0x80:
+        return None
+    square = (entry & 0x0F) - 1
+    action = divmod(square, 3) if square >= 0 else None
+    return action, (entry >> 4 & 0x03) - 1
+
+
+def minimax(board, engine="book"):
+    """
+    Returns the optimal action for the current player on the board,
+    searching with one of ENGINES:
+        - "book": a lookup in the opening book, falling back to bitboard
+          if there is no book (see book.py)
+        - "bitboard": alpha-beta on bitmasks, see bitboard.py
+        - "alphabeta": Alpha_Beta_Max and Alpha_Beta_Min
+        - "memoized": Max_Value and Min_Value, through the transposition
+          table it shares with alphabeta
+        - "exhaustive": Max_Value and Min_Value without the table, the
+          whole game tree, as the baseline for nodes
+    All return the first optimal action in the order of actions, and
+    set nodes to the number of positions visited.
+    """
+    global nodes
+    if engine not in ENGINES:
+        raise Exception(f"unknown engine: {engine}")
+    nodes = 0
+
+    if engine == "book":
+        entry = book_entry(board)
+        if entry is not None:
+            return entry[0]
+        engine = "bitboard"
+
+    if engine == "bitboard":
+        #Imported here, as bitboard imports this module
+        import bitboard
+
+        action = bitboard.minimax(board)
+        nodes = bitboard.nodes
+        return action
 
     if terminal(board):
         return None
@@ -166,21 +316,49 @@ def minimax(board):
     #Check whose turn it is
     current_player = player(board)
 
-    #Run Minimax for X
+    #Symmetric actions lead to the same position, so only the first of
+    #them is searched, except by the exhaustive baseline
+    searched = {}
+    table = None if engine == "exhaustive" else transpositions
+
+    #Run Minimax for X. Alpha-beta only needs to know whether an action
+    #beats the best so far, and stops at the first win
     if current_player == X:
         v = -math.inf
         for action in actions(board):
-            if Min_Value(result(board, action)) > v:
-                v = Min_Value(result(board, action))
+            child = result(board, action)
+            key = board_key(child)
+            if key in searched and table is not None:
+                value = searched[key]
+            elif engine == "alphabeta":
+                value = Alpha_Beta_Min(child, v, math.inf)
+            else:
+                value = Min_Value(child, table)
+            searched[key] = value
+            if value > v:
+                v = value
                 best_action = action
+            if engine == "alphabeta" and v == 1:
+                break
         return best_action
     # Run Minimax for O
     elif current_player == O:
         v = math.inf
         for action in actions(board):
-            if Max_Value(result(board, action)) < v:
-                v = Max_Value(result(board, action))
+            child = result(board, action)
+            key = board_key(child)
+            if key in searched and table is not None:
+                value = searched[key]
+            elif engine == "alphabeta":
+                value = Alpha_Beta_Max(child, -math.inf, v)
+            else:
+                value = Max_Value(child, table)
+            searched[key] = value
+            if value < v:
+                v = value
                 best_action = action
+            if engine == "alphabeta" and v == -1:
+                break
         return best_action
 
 
@@ -188,29 +366,136 @@ def minimax(board):
 
 
 
-def Max_Value(board):
+def Max_Value(board, table=transpositions):
     '''
-    Determines maximum value of a gameboard state
+    Determines maximum value of a gameboard state, memoized in table
+    unless it is None
     '''
+    global nodes
+    nodes += 1
+
+    if table is not None:
+        key = board_key(board)
+        if key in table:
+            return table[key]
+
     if terminal(board) == True:
-        return utility(board)
+        v = utility(board)
+    else:
+        v = -math.inf
+        for action in actions(board):
+            v = max(v,Min_Value(result(board, action), table))
 
-    v = -math.inf
+    if table is not None:
+        table[key] = v
+    return v
+
+
+def Min_Value(board, table=transpositions):
+    '''
+    Determines minimum value of a gameboard state, memoized in table
+    unless it is None
+    '''
+    global nodes
+    nodes += 1
+
+    if table is not None:
+        key = board_key(board)
+        if key in table:
+            return table[key]
 
-    for action in actions(board):
-        v = max(v,Min_Value(result(board, action)))
+    if terminal(board) == True:
+        v = utility(board)
+    else:
+        v = math.inf
+        for action in actions(board):
+            v = min(v,Max_Value(result(board, action), table))
+
+    if table is not None:
+        table[key] = v
     return v
 
 
-def Min_Value(board):
+def ordered_actions(board):
+    '''
+    Returns the possible actions on a gameboard, the killer move for its
+    number of empty squares first, then by history score, then center,
+    corners and edges
     '''
-    Determines minimum value of a gameboard state
+    moves = actions(board)
+    killer = killers.get(len(moves))
+    return sorted(moves, key=lambda action: (action != killer,
+                                             -history.get(action, 0),
+                                             MOVE_ORDER[action]))
+
+
+def record_cutoff(board, action):
     '''
+    Records that action caused a cutoff on a gameboard state, for
+    ordered_actions
+    '''
+    empty = len(actions(board))
+    killers[empty] = action
+    history[action] = history.get(action, 0) + empty * empty
+
+
+def Alpha_Beta_Max(board, alpha, beta):
+    '''
+    Determines maximum value of a gameboard state if it lies between alpha
+    and beta; otherwise returns a value no better than the bound crossed
+    '''
+    global nodes
+    nodes += 1
+
+    key = board_key(board)
+    if key in transpositions:
+        return transpositions[key]
     if terminal(board) == True:
-        return utility(board)
+        v = utility(board)
+        transpositions[key] = v
+        return v
 
-    v = math.inf
+    v = -math.inf
+    for action in ordered_actions(board):
+        v = max(v,Alpha_Beta_Min(result(board, action), max(alpha, v), beta))
+        #A win cannot be improved on
+        if v >= beta or v == 1:
+            if v >= beta:
+                record_cutoff(board, action)
+            break
+
+    #Only values strictly inside the window are exact
+    if alpha < v < beta or v == 1:
+        transpositions[key] = v
+    return v
+
+
+def Alpha_Beta_Min(board, alpha, beta):
+    '''
+    Determines minimum value of a gameboard state if it lies between alpha
+    and beta; otherwise returns a value no better than the bound crossed
+    '''
+    global nodes
+    nodes += 1
+
+    key = board_key(board)
+    if key in transpositions:
+        return transpositions[key]
+    if terminal(board) == True:
+        v = utility(board)
+        transpositions[key] = v
+        return v
 
-    for action in actions(board):
-        v = min(v,Max_Value(result(board, action)))
+    v = math.inf
+    for action in ordered_actions(board):
+        v = min(v,Alpha_Beta_Max(result(board, action), alpha, min(beta, v)))
+        #A win cannot be improved on
+        if v <= alpha or v == -1:
+            if v <= alpha:
+                record_cutoff(board, action)
+            break
+
+    #Only values strictly inside the window are exact
+    if alpha < v < beta or v == -1:
+        transpositions[key] = v
     return v